@@ -1,12 +1,24 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
 import time
 import math
 import random
 import board
+import endgame_solver
+import evaluation
+import game_records
 import greedy_ai
 import minimax_ai_H1
 import minimax_ai_H2
 import minimax_ai_H3
 import mcts_ai
+import minimax_search
+import opening_book
+import seeding
+import transposition
 
 AI_TYPES = {
     "1": "RandomAI",
@@ -17,31 +29,102 @@ AI_TYPES = {
     "6": "MinimaxAI-H3"
 }
 
-def get_ai_move(ai_type, board_obj, piece):
+# Seconds per move for the minimax agents. None searches to the fixed depths
+# below; a number switches to iterative deepening within that budget.
+MINIMAX_TIME_BUDGET = None
+
+# Worker processes for fixed-depth minimax; more than one splits the root's
+# moves across a process pool
+MINIMAX_WORKERS = 1
+
+# Worker processes for MCTS. "root" grows an independent tree per worker and
+# sums their root visit counts; "leaf" grows one tree and spreads batches of
+# rollouts over the workers.
+MCTS_WORKERS = 1
+MCTS_PARALLEL_MODE = "root"
+
+# Play MCTS leaves out in vectorized batches instead of one game at a time
+MCTS_BATCHED_ROLLOUTS = False
+
+# Opening book files (built with opening_book.py). A minimax agent takes its
+# moves from the book it built while the position is in it, and searches
+# every move if it has none.
+OPENING_BOOKS = []
+
+# Finished games between checkpoint saves
+CHECKPOINT_INTERVAL = 10
+
+MINIMAX_MODULES = {
+    "MinimaxAI-H1": (minimax_ai_H1, 6),
+    "MinimaxAI-H2": (minimax_ai_H2, 6),
+    "MinimaxAI-H3": (minimax_ai_H3, 4)
+}
+
+def agent_params(ai_type, overrides=None):
+    # An agent's settings: the module defaults above with any overrides applied
+    if ai_type in MINIMAX_MODULES:
+        params = {"depth": MINIMAX_MODULES[ai_type][1], "time_budget": MINIMAX_TIME_BUDGET, "workers": MINIMAX_WORKERS,
+                  "book": opening_book.book_for(OPENING_BOOKS, ai_type)}
+    elif ai_type == "MCTS":
+        params = {"time_budget": None, "iterations": None, "workers": MCTS_WORKERS,
+                  "parallel_mode": MCTS_PARALLEL_MODE, "batched": MCTS_BATCHED_ROLLOUTS}
+    else:
+        params = {}
+    for key, value in (overrides or {}).items():
+        if key not in params:
+            raise ValueError(f"{ai_type} has no parameter {key}")
+        params[key] = value
+    return params
+
+def get_ai_move(ai_type, board_obj, piece, params=None, mcts_player=None, rng=None):
+    # rng is passed on to the agent; see seeding.make_rng for what it may be
+    overrides = params or {}
+    params = agent_params(ai_type, overrides)
+    rng = seeding.make_rng(rng)
+    if params.get("book") is not None:
+        col = opening_book.book_move(params["book"], board_obj, ai_type)
+        if col is not None:
+            return col
     if ai_type == "RandomAI":
-        return random.choice([c for c in range(board_obj.column_count) if board_obj.is_valid_location(c)])
+        return rng.choice([c for c in range(board_obj.column_count) if board_obj.is_valid_location(c)])
     elif ai_type == "GreedyAI":
-        return greedy_ai.greedy_move(board_obj, piece)
-    elif ai_type == "MinimaxAI-H1":
-        col, _ = minimax_ai_H1.minimax(board_obj, depth=6, alpha=-math.inf, beta=math.inf, maximizingPlayer=True, piece=piece)
-        return col
-    elif ai_type == "MinimaxAI-H2":
-        col, _ = minimax_ai_H2.minimax(board_obj, depth=6, alpha=-math.inf, beta=math.inf, maximizingPlayer=True, piece=piece)
-        return col
-    elif ai_type == "MinimaxAI-H3":
-        col, _ = minimax_ai_H3.minimax(board_obj, depth=4, alpha=-math.inf, beta=math.inf, maximizingPlayer=True, piece=piece)
+        return greedy_ai.greedy_move(board_obj, piece, rng)
+    elif ai_type in MINIMAX_MODULES:
+        module = MINIMAX_MODULES[ai_type][0]
+        if params["time_budget"] is not None:
+            # Deepen until the budget runs out unless a depth limit was asked for
+            max_depth = overrides["depth"] if "depth" in overrides else None
+            col, _ = module.iterative_deepening(board_obj, piece, params["time_budget"], max_depth, rng)
+        elif params["workers"] > 1:
+            col, _ = module.parallel_minimax(board_obj, params["depth"], piece, params["workers"], rng)
+        else:
+            col, _ = module.minimax(board_obj, depth=params["depth"], alpha=-math.inf, beta=math.inf, maximizingPlayer=True, piece=piece, rng=rng)
         return col
     elif ai_type == "MCTS":
-        return mcts_ai.mcts_move(board_obj, piece)
+        budget = {"time_budget": params["time_budget"], "iterations": params["iterations"], "rng": rng}
+        if params["workers"] > 1 and params["parallel_mode"] == "root":
+            col, _ = mcts_ai.root_parallel_move(board_obj, piece, params["workers"], **budget)
+        elif mcts_player is not None:
+            col, _ = mcts_player.move(board_obj, params["workers"], params["batched"], **budget)
+        else:
+            col, _ = mcts_ai.mcts_move(board_obj, piece, params["workers"], params["batched"], **budget)
+        return col
     else:
         raise ValueError(f"Unknown AI type: {ai_type}")
 
-def simulate_game(p1_type, p2_type):
-    game_board = board.Board(6, 7)
+def simulate_game(p1_type, p2_type, params=None, rng=None):
+    # params maps an AI type to its parameter overrides. rng makes the opening
+    # moves and every agent's random choices, so a seeded game replays move for
+    # move as long as no agent plays to a time budget.
+    params = params or {}
+    rng = seeding.make_rng(rng)
+    game_board = board.BitBoard(6, 7)
     turn = 1
     player_types = {1: p1_type, 2: p2_type}
     
     move_times = {1: [], 2: []}
+    moves = []  # columns played, in order
+    mcts_players = {1: mcts_ai.MCTSPlayer(1), 2: mcts_ai.MCTSPlayer(2)}  # keep their trees for the whole game
     move_count = 0  # Track how many moves have been made
 
     while True:
@@ -52,9 +135,10 @@ def simulate_game(p1_type, p2_type):
 
         # First two moves are always random
         if move_count < 2:
-            col = random.choice([c for c in range(game_board.column_count) if game_board.is_valid_location(c)])
+            col = rng.choice([c for c in range(game_board.column_count) if game_board.is_valid_location(c)])
         else:
-            col = get_ai_move(ai_type, game_board, current_player)
+            col = get_ai_move(ai_type, game_board, current_player, params.get(ai_type), mcts_players[current_player],
+                              rng)
 
         move_duration = time.time() - start_time
         move_times[current_player].append(move_duration)
@@ -62,19 +146,111 @@ def simulate_game(p1_type, p2_type):
         if col is not None and game_board.is_valid_location(col):
             row = game_board.get_next_open_row(col)
             game_board.drop_piece(row, col, current_player)
+            moves.append(col)
             move_count += 1
 
-            if game_board.has_four_in_a_row(current_player):
-                return current_player, move_times
+            if game_board.wins_after(row, col, current_player):
+                return current_player, move_times, moves
             elif game_board.is_full():
-                return 0, move_times
+                return 0, move_times, moves
             turn = 2 if turn == 1 else 1
         else:
             # If invalid move is made, the other player wins
-            return 3 - current_player, move_times
+            return 3 - current_player, move_times, moves
+
+
+def game_seed(seed, index):
+    # Seed for one game of a matchup, independent of which process plays it
+    return (seed * 1000003 + index) % (1 << 63)
+
+def search_counters():
+    # This process's search statistics since it started, by name. Cache
+    # counters are named "Cache <namespace> <counter>".
+    tt_stats = transposition.shared_table.stats()
+    counters = {
+        "TT Probes": tt_stats["probes"],
+        "TT Hits": tt_stats["hits"],
+        "Minimax Nodes": minimax_search.search_stats["total_nodes"],
+        "Solver Positions": endgame_solver.solver_stats["solves"],
+        "Solver Nodes": endgame_solver.solver_stats["nodes"],
+        "Solver Time": endgame_solver.solver_stats["time"]
+    }
+    for namespace, namespace_counters in evaluation.shared_cache.counters.items():
+        for name, count in namespace_counters.items():
+            counters[f"Cache {namespace} {name}"] = count
+    return counters
+
+def play_game(index, ai1, ai2, seed, params=None):
+    # Play game number index of a matchup; AI 1 moves first in even games.
+    # The game starts from an empty transposition table so its moves do not
+    # depend on which games this process played before. Returns the winner,
+    # move times and moves, plus how much the game added to search_counters(),
+    # since a game played in a worker process leaves nothing in ours.
+    transposition.shared_table.clear(keep_stats=True)
+    if index % 2 == 0:
+        p1_type, p2_type = ai1, ai2
+    else:
+        p1_type, p2_type = ai2, ai1
+    before = search_counters()
+    result, move_times, moves = simulate_game(p1_type, p2_type, params, random.Random(seed))
+    counters = {name: count - before.get(name, 0) for name, count in search_counters().items()}
+    return result, move_times, moves, counters
 
+def record_game(stats, index, result, move_times):
+    # Determine which AI is actually Player 1 and Player 2 in this game
+    if index % 2 == 0:
+        ai1_player, ai2_player = 1, 2
+    else:
+        ai1_player, ai2_player = 2, 1
+
+    # Accumulate times and move counts
+    stats["P1 Time"] += sum(move_times[ai1_player])
+    stats["P2 Time"] += sum(move_times[ai2_player])
+    stats["P1 Moves"] += len(move_times[ai1_player])
+    stats["P2 Moves"] += len(move_times[ai2_player])
 
-def run_matchup(ai1, ai2, num_games):
+    if result == ai1_player:
+        stats["P1 Wins"] += 1
+    elif result == ai2_player:
+        stats["P2 Wins"] += 1
+    else:
+        stats["Draws"] += 1
+
+def load_checkpoint(path, ai1, ai2, num_games, seed):
+    # Return the saved progress for this run, or None if there is no checkpoint
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["agents"] != [ai1, ai2] or checkpoint["num_games"] != num_games or \
+            (seed is not None and checkpoint["seed"] != seed):
+        raise ValueError(f"Checkpoint {path} belongs to a different run")
+    return checkpoint
+
+def save_checkpoint(path, ai1, ai2, num_games, seed, stats, completed):
+    # Write to a temporary file first so an interruption never leaves a
+    # half-written checkpoint behind
+    checkpoint = {
+        "agents": [ai1, ai2],
+        "num_games": num_games,
+        "seed": seed,
+        "stats": stats,
+        "completed": sorted(completed)
+    }
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+def run_matchup(ai1, ai2, num_games, workers=1, seed=None, params=None, record_path=None, checkpoint_path=None):
+    # With more than one worker the games are played in a process pool and
+    # counted as they finish. Every game is seeded from seed and its index, so
+    # the same seed replays the same games either way. With record_path each
+    # game is appended to that game record file as it finishes.
+    #
+    # With checkpoint_path the stats and finished game indices are saved every
+    # CHECKPOINT_INTERVAL games, and a later call with the same checkpoint
+    # picks up from there, skipping the games already played. Games finished
+    # after the last save are played again but not recorded a second time.
     stats = {
         "P1 Wins": 0,
         "P2 Wins": 0,
@@ -84,34 +260,51 @@ def run_matchup(ai1, ai2, num_games):
         "P1 Moves": 0,
         "P2 Moves": 0
     }
+    completed = set()
+    checkpoint = load_checkpoint(checkpoint_path, ai1, ai2, num_games, seed)
+    if checkpoint is not None:
+        seed = checkpoint["seed"]
+        stats.update(checkpoint["stats"])
+        completed.update(checkpoint["completed"])
+        print(f"Resuming from {checkpoint_path}: {len(completed)}/{num_games} games already played")
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    # (seed, agents) of the games already in the record file when resuming
+    recorded = set()
+    if checkpoint is not None and record_path and os.path.exists(record_path):
+        recorded = {(record.seed, record.agents) for record in game_records.read_records(record_path)}
 
-    for i in range(num_games):
-        print("Game:", i)
-        if i % 2 == 0:
-            p1_type, p2_type = ai1, ai2
-        else:
-            p1_type, p2_type = ai2, ai1
-
-        result, move_times = simulate_game(p1_type, p2_type)
+    remaining = [i for i in range(num_games) if i not in completed]
+    executor = None
+    if workers > 1:
+        # A pool of its own rather than worker_pool's, which the agents in
+        # the games use for their own parallel searches
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        futures = {executor.submit(play_game, i, ai1, ai2, game_seed(seed, i), params): i for i in remaining}
+        games = ((futures[future], future.result()) for future in concurrent.futures.as_completed(futures))
+    else:
+        games = ((i, play_game(i, ai1, ai2, game_seed(seed, i), params)) for i in remaining)
 
-        # Determine which AI is actually Player 1 and Player 2 in this game
-        if i % 2 == 0:
-            ai1_player, ai2_player = 1, 2
-        else:
-            ai1_player, ai2_player = 2, 1
-
-        # Accumulate times and move counts
-        stats["P1 Time"] += sum(move_times[ai1_player])
-        stats["P2 Time"] += sum(move_times[ai2_player])
-        stats["P1 Moves"] += len(move_times[ai1_player])
-        stats["P2 Moves"] += len(move_times[ai2_player])
-
-        if result == ai1_player:
-            stats["P1 Wins"] += 1
-        elif result == ai2_player:
-            stats["P2 Wins"] += 1
-        else:
-            stats["Draws"] += 1
+    writer = game_records.GameRecordWriter(record_path) if record_path else None
+    try:
+        for i, (result, move_times, moves, counters) in games:
+            record_game(stats, i, result, move_times)
+            for name, count in counters.items():
+                stats[name] = stats.get(name, 0) + count
+            completed.add(i)
+            agents = (ai1, ai2) if i % 2 == 0 else (ai2, ai1)
+            if writer is not None and (game_seed(seed, i), agents) not in recorded:
+                # Player 1 made the even-numbered moves
+                times = [move_times[1 + m % 2][m // 2] for m in range(len(moves))]
+                writer.write(moves, result, times, agents, game_seed(seed, i))
+            if checkpoint_path and (len(completed) % CHECKPOINT_INTERVAL == 0 or len(completed) == num_games):
+                save_checkpoint(checkpoint_path, ai1, ai2, num_games, seed, stats, completed)
+            print(f"Game {i} finished ({len(completed)}/{num_games})")
+    finally:
+        if writer is not None:
+            writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
 
     return stats
 
@@ -133,9 +326,189 @@ def print_stats(ai1, ai2, stats, num_games):
     print("\nAverage Move Time:")
     print(f"{ai1}: {avg_p1_time:.4f} sec/move")
     print(f"{ai2}: {avg_p2_time:.4f} sec/move")
+
+    # Search statistics are the ones play_game reported, so they cover games
+    # played in worker processes too
+    probes = stats.get("TT Probes", 0)
+    if probes > 0:
+        print("\nTransposition Table:")
+        print(f"Hit Rate: {stats['TT Hits'] / probes * 100:.2f}% of {probes} probes")
+    if stats.get("Minimax Nodes", 0) > 0:
+        print(f"Minimax Nodes Searched: {stats['Minimax Nodes']}")
+    namespaces = sorted({name.split(" ")[1] for name in stats if name.startswith("Cache ")})
+    if namespaces:
+        print("\nEvaluation Cache:")
+        for namespace in namespaces:
+            hits, misses = stats[f"Cache {namespace} hits"], stats[f"Cache {namespace} misses"]
+            hit_rate = hits / (hits + misses) if hits + misses else 0.0
+            print(f"{namespace}: {hit_rate * 100:.2f}% hits, {misses} misses, "
+                  f"{stats[f'Cache {namespace} evictions']} evictions")
+    if stats.get("Solver Positions", 0) > 0:
+        nodes_per_second = stats["Solver Nodes"] / stats["Solver Time"] if stats["Solver Time"] > 0 else 0.0
+        print(f"Endgame Solver: {stats['Solver Positions']} positions, {stats['Solver Nodes']} nodes, "
+              f"{nodes_per_second:.0f} nodes/sec")
+    print("====================================\n")
+
+def run_league(agents, num_games, workers=1, seed=None, params=None, record_path=None, checkpoint_path=None):
+    # Round robin: every pair of agents plays num_games, alternating who
+    # starts. Returns each pairing's stats keyed by (agent, opponent). Each
+    # pairing keeps its own checkpoint next to checkpoint_path, which holds the
+    # league's seed so a resumed league replays the same pairings.
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["agents"] != list(agents) or (seed is not None and checkpoint["seed"] != seed):
+            raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different league")
+        seed = checkpoint["seed"]
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    if checkpoint_path:
+        with open(checkpoint_path + ".tmp", "w") as f:
+            json.dump({"agents": list(agents), "seed": seed}, f)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+    results = {}
+    for a, ai1 in enumerate(agents):
+        for ai2 in agents[a + 1:]:
+            print(f"\n--- {ai1} vs {ai2} ---")
+            pairing_checkpoint = f"{checkpoint_path}.{ai1}-vs-{ai2}" if checkpoint_path else None
+            results[(ai1, ai2)] = run_matchup(ai1, ai2, num_games, workers, game_seed(seed, len(results)), params,
+                                              record_path, pairing_checkpoint)
+    return results
+
+def estimate_elo(results, agents, iterations=1000):
+    # Fit ratings to the league's results, counting a draw as half a point.
+    # Each pairing gets one virtual draw so a perfect score stays finite, and
+    # the ratings are shifted to average 1500.
+    scores = {}
+    for (ai1, ai2), stats in results.items():
+        games = stats["P1 Wins"] + stats["P2 Wins"] + stats["Draws"]
+        scores[(ai1, ai2)] = (stats["P1 Wins"] + 0.5 * stats["Draws"] + 0.5, games + 1)
+        scores[(ai2, ai1)] = (stats["P2 Wins"] + 0.5 * stats["Draws"] + 0.5, games + 1)
+
+    ratings = {agent: 0.0 for agent in agents}
+    for _ in range(iterations):
+        for agent in agents:
+            actual = expected = games_played = 0.0
+            for (a, b), (points, games) in scores.items():
+                if a == agent:
+                    actual += points
+                    expected += games / (1 + 10 ** ((ratings[b] - ratings[a]) / 400))
+                    games_played += games
+            if games_played:
+                ratings[agent] += 400 * (actual - expected) / games_played
+    mean = sum(ratings.values()) / len(ratings)
+    return {agent: rating - mean + 1500 for agent, rating in ratings.items()}
+
+def print_league(agents, results):
+    # Crosstable of each row agent's score against each column agent, then
+    # Elo and average move time per agent
+    score = {}
+    time_spent = {agent: 0.0 for agent in agents}
+    moves = {agent: 0 for agent in agents}
+    for (ai1, ai2), stats in results.items():
+        games = stats["P1 Wins"] + stats["P2 Wins"] + stats["Draws"]
+        if games:
+            score[(ai1, ai2)] = (stats["P1 Wins"] + 0.5 * stats["Draws"]) / games
+            score[(ai2, ai1)] = (stats["P2 Wins"] + 0.5 * stats["Draws"]) / games
+        time_spent[ai1] += stats["P1 Time"]
+        time_spent[ai2] += stats["P2 Time"]
+        moves[ai1] += stats["P1 Moves"]
+        moves[ai2] += stats["P2 Moves"]
+    ratings = estimate_elo(results, agents)
+
+    width = max(len(agent) for agent in agents) + 2
+    print("\n=== League Crosstable (row agent's score vs column agent) ===")
+    print("".ljust(width) + "".join(agent.rjust(width) for agent in agents))
+    for a in agents:
+        cells = ["-" if a == b or (a, b) not in score else f"{score[(a, b)] * 100:.1f}%" for b in agents]
+        print(a.ljust(width) + "".join(cell.rjust(width) for cell in cells))
+
+    print()
+    print("Agent".ljust(width) + "Elo".rjust(8) + "Avg Move Time".rjust(18))
+    for agent in sorted(agents, key=ratings.get, reverse=True):
+        avg_time = time_spent[agent] / moves[agent] if moves[agent] > 0 else 0
+        print(agent.ljust(width) + f"{ratings[agent]:.0f}".rjust(8) + f"{avg_time:.4f} sec/move".rjust(18))
     print("====================================\n")
 
-def main():
+def resolve_agent(name):
+    # Accept either a menu number or an AI type name
+    if name in AI_TYPES:
+        return AI_TYPES[name]
+    for ai_type in AI_TYPES.values():
+        if name.lower() == ai_type.lower():
+            return ai_type
+    raise argparse.ArgumentTypeError(f"unknown AI: {name}")
+
+def parse_param(text):
+    # AGENT.KEY=VALUE, e.g. MinimaxAI-H1.depth=4 or MCTS.time_budget=0.1
+    try:
+        target, value = text.split("=", 1)
+        agent, key = target.rsplit(".", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected AGENT.KEY=VALUE, got {text}")
+    agent = resolve_agent(agent)
+    if value.lower() in ("none", "true", "false"):
+        value = {"none": None, "true": True, "false": False}[value.lower()]
+    else:
+        try:
+            value = int(value)
+        except ValueError:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+    try:
+        agent_params(agent, {key: value})
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return agent, key, value
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Pit Connect 4 AIs against each other.")
+    parser.add_argument("agents", nargs="*", type=resolve_agent,
+                        help="AI names or menu numbers; two play a matchup, more (or --league) a round robin")
+    parser.add_argument("--league", action="store_true", help="round robin across the agents, or all AIs if none are given")
+    parser.add_argument("-n", "--games", type=int, default=10, help="games per pairing")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    parser.add_argument("--workers", type=int, default=1, help="processes playing games in parallel")
+    parser.add_argument("--record", metavar="PATH", help="append every finished game to this game record file")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="save progress here and resume from it if it exists")
+    parser.add_argument("--book", action="append", default=[], metavar="PATH",
+                        help="opening book, used by the minimax agent that built it; may be repeated")
+    parser.add_argument("--param", action="append", type=parse_param, default=[], metavar="AGENT.KEY=VALUE",
+                        help="agent setting such as MinimaxAI-H1.depth=4, MinimaxAI-H2.time_budget=0.5, "
+                             "MinimaxAI-H1.workers=4 or MCTS.iterations=2000; may be repeated")
+    args = parser.parse_args(argv)
+    if not args.league and len(args.agents) != 2:
+        parser.error("give exactly two agents, or --league")
+    return args
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        args = parse_args(argv)
+        params = {}
+        for path in args.book:
+            params.setdefault(opening_book.get_book(path).agent, {})["book"] = path
+        for agent, key, value in args.param:
+            params.setdefault(agent, {})[key] = value
+        for agent, agent_overrides in params.items():
+            path = agent_overrides.get("book")
+            if path is not None and opening_book.get_book(path).agent != agent:
+                sys.exit(f"{path} was built by {opening_book.get_book(path).agent}, not {agent}")
+        if args.league:
+            agents = args.agents or list(AI_TYPES.values())
+            results = run_league(agents, args.games, args.workers, args.seed, params, args.record,
+                                 args.checkpoint)
+            print_league(agents, results)
+        else:
+            ai1, ai2 = args.agents
+            stats = run_matchup(ai1, ai2, args.games, args.workers, args.seed, params, args.record,
+                                 args.checkpoint)
+            print_stats(ai1, ai2, stats, args.games)
+        return
+
     print("Available AIs:")
     for key, name in AI_TYPES.items():
         print(f"{key}: {name}")
@@ -143,6 +516,7 @@ def main():
     p1_choice = input("Select AI 1 (as Player 1 half the time): ")
     p2_choice = input("Select AI 2 (as Player 2 half the time): ")
     num_games = int(input("How many games to simulate? "))
+    workers = int(input("How many worker processes? (1 plays games one at a time) ") or 1)
 
     if p1_choice not in AI_TYPES or p2_choice not in AI_TYPES:
         print("Invalid AI selection.")
@@ -151,7 +525,7 @@ def main():
     ai1 = AI_TYPES[p1_choice]
     ai2 = AI_TYPES[p2_choice]
 
-    stats = run_matchup(ai1, ai2, num_games)
+    stats = run_matchup(ai1, ai2, num_games, workers)
     print_stats(ai1, ai2, stats, num_games)
 
 if __name__ == "__main__":
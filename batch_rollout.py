@@ -0,0 +1,46 @@
+import random
+import numpy as np
+import evaluation
+
+
+def batch_rollouts(grids, players, rng=None):
+    # Play one random game from each of the stacked positions in grids, shape
+    # (games, rows, columns), all at once. players holds the piece to move in
+    # each position. Returns the winning piece of every game, 0 for a draw.
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    boards = np.array(grids, dtype=np.int8)
+    games, row_count, column_count = boards.shape
+    flat = boards.reshape(games, row_count * column_count)
+    windows = evaluation.window_indices(row_count, column_count)
+    heights = np.count_nonzero(boards, axis=1)
+    player = np.array(players, dtype=np.int8)
+    results = np.zeros(games, dtype=np.int8)
+
+    # Positions that are already won
+    for piece in (1, 2):
+        won = (flat[:, windows] == piece).all(axis=2).any(axis=1)
+        results[won] = piece
+    active = np.nonzero(results == 0)[0]
+
+    while len(active):
+        legal = heights[active] < row_count
+        # Games with no legal move left are draws
+        active = active[legal.any(axis=1)]
+        legal = legal[legal.any(axis=1)]
+        if not len(active):
+            break
+
+        # Uniform choice among each game's legal columns
+        choice = np.where(legal, rng.random(legal.shape), -1.0).argmax(axis=1)
+        rows = heights[active, choice]
+        movers = player[active]
+        flat[active, rows * column_count + choice] = movers
+        heights[active, choice] += 1
+
+        won = (flat[active][:, windows] == movers[:, None, None]).all(axis=2).any(axis=1)
+        results[active[won]] = movers[won]
+        active = active[~won]
+        player[active] = 3 - player[active]
+
+    return results
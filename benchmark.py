@@ -0,0 +1,259 @@
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import board
+import endgame_solver
+import evaluation
+import greedy_ai
+import mcts_ai
+import minimax_ai_H1
+import minimax_ai_H2
+import minimax_ai_H3
+import minimax_search
+import transposition
+
+POSITIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+POSITION_SETS = ("opening", "midgame", "tactical", "endgame")
+BASELINE_PATH = os.path.join(POSITIONS_DIR, "baseline.json")
+
+BACKENDS = {"Board": board.Board, "BitBoard": board.BitBoard}
+
+# Deepest search timed per minimax agent, the simulator's fixed depths
+MINIMAX_DEPTHS = {"MinimaxAI-H1": (minimax_ai_H1, 6), "MinimaxAI-H2": (minimax_ai_H2, 6),
+                  "MinimaxAI-H3": (minimax_ai_H3, 4)}
+
+# Each heuristic's window score table and center column weight, as its
+# score_position uses them
+HEURISTICS = {"MinimaxAI-H1": (minimax_ai_H1.WINDOW_SCORES, 0), "MinimaxAI-H2": (minimax_ai_H2.WINDOW_SCORES, 0),
+              "MinimaxAI-H3": (minimax_ai_H3.WINDOW_SCORES, 0), "GreedyAI": (greedy_ai.WINDOW_SCORES, 2)}
+
+MCTS_PLAYOUTS = 1000  # playouts per position
+MICRO_CALLS = 200  # calls per position in the microbenchmarks
+REPEATS = 3  # each measurement keeps its fastest of this many runs
+
+# Allowed slowdown against the baseline before a metric counts as a regression
+SLOWDOWN_THRESHOLD = 0.25
+
+
+def load_positions(name):
+    # Each line of a position file is the columns played from the empty
+    # board, "-" being the empty board; "#" starts a comment
+    positions = []
+    with open(os.path.join(POSITIONS_DIR, name + ".txt")) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                positions.append([] if line == "-" else [int(col) for col in line])
+    return positions
+
+def make_board(backend, moves):
+    # The position after moves on a 6x7 board, and the piece to move
+    board_obj = BACKENDS[backend](6, 7)
+    for i, col in enumerate(moves):
+        board_obj.play(col, i % 2 + 1)
+    return board_obj, len(moves) % 2 + 1
+
+
+def best_time(run):
+    # Fastest of REPEATS runs of run(), which returns a value to keep
+    best, result = math.inf, None
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+def bench_has_four_in_a_row(backend, positions):
+    boards = [make_board(backend, moves)[0] for moves in positions]
+    def run():
+        for board_obj in boards:
+            for _ in range(MICRO_CALLS):
+                board_obj.has_four_in_a_row(1)
+                board_obj.has_four_in_a_row(2)
+    elapsed, _ = best_time(run)
+    return {"calls_per_second": 2 * MICRO_CALLS * len(boards) / elapsed}
+
+def bench_score_position(table, center_weight, positions):
+    grids = [make_board("BitBoard", moves)[0].grid for moves in positions]
+    def run():
+        for grid in grids:
+            for _ in range(MICRO_CALLS):
+                evaluation.score_grid(grid, 1, table, center_weight)
+    elapsed, _ = best_time(run)
+    return {"calls_per_second": MICRO_CALLS * len(grids) / elapsed}
+
+def bench_minimax(module, max_depth, backend, positions):
+    # Deepen one depth at a time from an empty table, as iterative deepening
+    # does, timing how long each position takes to finish every depth
+    seconds_to_depth = [0.0] * (max_depth + 1)
+    total_nodes = 0
+    total_time = 0.0
+    for moves in positions:
+        board_obj, piece = make_board(backend, moves)
+        def run():
+            transposition.shared_table.clear()
+            elapsed = 0.0
+            nodes = 0
+            to_depth = []
+            for depth in range(1, max_depth + 1):
+                start_time = time.perf_counter()
+                module.minimax(board_obj, depth, -math.inf, math.inf, True, piece, rng=0)
+                elapsed += time.perf_counter() - start_time
+                nodes += minimax_search.search_stats["nodes"]
+                to_depth.append(elapsed)
+            return nodes, to_depth
+        elapsed, (nodes, to_depth) = best_time(run)
+        for depth, seconds in enumerate(to_depth, 1):
+            seconds_to_depth[depth] += seconds
+        total_nodes += nodes
+        total_time += elapsed
+    metrics = {"nodes_per_second": total_nodes / total_time}
+    for depth in range(1, max_depth + 1):
+        metrics[f"seconds_to_depth_{depth}"] = seconds_to_depth[depth] / len(positions)
+    return metrics
+
+def bench_mcts(backend, positions, batched):
+    total_playouts = 0
+    total_time = 0.0
+    for moves in positions:
+        board_obj, piece = make_board(backend, moves)
+        elapsed, (_, info) = best_time(lambda: mcts_ai.mcts_move(board_obj, piece, batched=batched,
+                                                                 iterations=MCTS_PLAYOUTS, early_stop=False, rng=0))
+        total_playouts += info["playouts"]
+        total_time += elapsed
+    return {"playouts_per_second": total_playouts / total_time}
+
+def bench_greedy(backend, positions):
+    boards = [make_board(backend, moves) for moves in positions]
+    def run():
+        for board_obj, piece in boards:
+            greedy_ai.greedy_move(board_obj, piece, 0)
+    elapsed, _ = best_time(run)
+    return {"moves_per_second": len(boards) / elapsed}
+
+def bench_solver(backend, positions):
+    total_nodes = 0
+    total_time = 0.0
+    for moves in positions:
+        board_obj, piece = make_board(backend, moves)
+        def run():
+            endgame_solver.table.clear()
+            return endgame_solver.solve(board_obj, piece)
+        elapsed, solution = best_time(run)
+        total_nodes += solution.nodes
+        total_time += elapsed
+    return {"nodes_per_second": total_nodes / total_time, "seconds_per_position": total_time / len(positions)}
+
+
+def run_benchmarks(sets=POSITION_SETS, backends=tuple(BACKENDS), agents=None, max_depth=None):
+    # Returns {benchmark name: {metric: value}}. Names read
+    # backend.agent.position_set; metrics ending in _per_second are rates,
+    # the rest are seconds. Agents are timed with the evaluation cache and
+    # the endgame solver switched off so their own search is what is measured;
+    # the solver gets its own entry on the endgame set.
+    agents = agents or list(MINIMAX_DEPTHS) + ["MCTS", "MCTS-batched", "GreedyAI", "EndgameSolver"]
+    cache, threshold = evaluation.shared_cache, endgame_solver.EMPTY_CELL_THRESHOLD
+    evaluation.shared_cache = evaluation.EvaluationCache(size=0)
+    endgame_solver.EMPTY_CELL_THRESHOLD = 0
+    results = {}
+    try:
+        for set_name in sets:
+            positions = load_positions(set_name)
+            for name, (table, center_weight) in HEURISTICS.items():
+                results[f"score_position.{name}.{set_name}"] = bench_score_position(table, center_weight, positions)
+            for backend in backends:
+                prefix = f"{backend}.{{}}.{set_name}"
+                print(f"{set_name} positions on {backend}", flush=True)
+                results[prefix.format("has_four_in_a_row")] = bench_has_four_in_a_row(backend, positions)
+                for agent in agents:
+                    if agent in MINIMAX_DEPTHS:
+                        module, depth = MINIMAX_DEPTHS[agent]
+                        results[prefix.format(agent)] = bench_minimax(module, min(depth, max_depth or depth), backend,
+                                                                      positions)
+                    elif agent == "MCTS" or agent == "MCTS-batched":
+                        results[prefix.format(agent)] = bench_mcts(backend, positions, agent == "MCTS-batched")
+                    elif agent == "GreedyAI":
+                        results[prefix.format(agent)] = bench_greedy(backend, positions)
+                    elif agent == "EndgameSolver" and set_name == "endgame":
+                        results[prefix.format(agent)] = bench_solver(backend, positions)
+    finally:
+        evaluation.shared_cache, endgame_solver.EMPTY_CELL_THRESHOLD = cache, threshold
+    return results
+
+
+def compare(results, baseline, threshold=SLOWDOWN_THRESHOLD):
+    # Metrics more than threshold slower than the baseline, as
+    # (benchmark, metric, baseline value, current value, slowdown)
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if old is None or old <= 0 or value <= 0:
+                continue
+            slowdown = old / value if metric.endswith("_per_second") else value / old
+            if slowdown > 1 + threshold:
+                regressions.append((name, metric, old, value, slowdown))
+    return regressions
+
+def print_results(results, baseline=None):
+    print("\n========== Benchmark Results ==========")
+    for name, metrics in results.items():
+        print(name)
+        for metric, value in metrics.items():
+            line = f"  {metric:<24}{value:>14.6g}"
+            old = (baseline or {}).get(name, {}).get(metric)
+            if old:
+                line += f"  ({(value - old) / old * 100:+.1f}% vs baseline)"
+            print(line)
+    print("=======================================\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Connect 4 agents and boards on fixed positions.")
+    parser.add_argument("--sets", nargs="+", choices=POSITION_SETS, default=list(POSITION_SETS),
+                        help="position sets to run")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS),
+                        help="board implementations to run on")
+    parser.add_argument("--agents", nargs="+", help="agents to time, all by default")
+    parser.add_argument("--max-depth", type=int, help="cap on the minimax search depth")
+    parser.add_argument("--output", metavar="PATH", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--baseline", metavar="PATH", default=BASELINE_PATH, help="results to compare against")
+    parser.add_argument("--threshold", type=float, default=SLOWDOWN_THRESHOLD,
+                        help="allowed slowdown against the baseline, e.g. 0.25 for 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help="also store these results as the baseline")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = run_benchmarks(args.sets, args.backends, args.agents, args.max_depth)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, value, slowdown in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.6g} -> {value:.6g} ({slowdown:.2f}x slower)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold * 100:.0f}% against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
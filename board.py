@@ -1,10 +1,26 @@
+import functools
+import random
 import numpy as np
 
+ZOBRIST_SEED = 0xC0441  # fixed so hashes agree between processes and runs
+
+
+@functools.lru_cache(maxsize=None)
+def zobrist_keys(row_count, column_count):
+    # One random 64-bit key per (row, column, piece); index 0 is the empty piece
+    rng = random.Random(ZOBRIST_SEED)
+    return [[(0, rng.getrandbits(64), rng.getrandbits(64)) for c in range(column_count)] for r in range(row_count)]
+
+
 class Board:
     def __init__(self, row_count, column_count):
         self.row_count = row_count
         self.column_count = column_count
         self.grid = np.zeros((row_count, column_count))
+        self.moves = []
+        self.zobrist = zobrist_keys(row_count, column_count)
+        self.hash = 0  # Zobrist hash of the pieces on the board
+        self.mirror_hash = 0  # Zobrist hash of the board's left-right mirror image
 
     def is_valid_location(self, column):
         # Check if last row in column is empty
@@ -19,6 +35,28 @@ class Board:
     def drop_piece(self, row, column, turn):
         # Fill the specified point with the current turn
         self.grid[row, column] = turn
+        self.hash ^= self.zobrist[row][column][turn]
+        self.mirror_hash ^= self.zobrist[row][self.column_count - 1 - column][turn]
+
+    def remove_piece(self, row, column):
+        # Empty the specified point again
+        piece = int(self.grid[row, column])
+        self.hash ^= self.zobrist[row][column][piece]
+        self.mirror_hash ^= self.zobrist[row][self.column_count - 1 - column][piece]
+        self.grid[row, column] = 0
+
+    def play(self, column, turn):
+        # Drop a piece and remember where it landed so it can be undone
+        row = self.get_next_open_row(column)
+        self.drop_piece(row, column, turn)
+        self.moves.append((row, column))
+        return row
+
+    def undo(self):
+        # Take back the most recent move made with play
+        row, column = self.moves.pop()
+        self.remove_piece(row, column)
+        return row, column
 
     def has_four_in_a_row(self, turn):
         # Check horizontally
@@ -47,14 +85,154 @@ class Board:
 
         return False
 
+    def wins_after(self, row, column, turn):
+        # Only the lines passing through the given point can have been completed by it
+        for row_step, column_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                r = row + sign * row_step
+                c = column + sign * column_step
+                while 0 <= r < self.row_count and 0 <= c < self.column_count and self.grid[r, c] == turn:
+                    count += 1
+                    r += sign * row_step
+                    c += sign * column_step
+            if count >= 4:
+                return True
+        return False
+
+    def canonical_hash(self):
+        # Same for a position and its mirror image, which play out identically
+        # with the columns reversed
+        return min(self.hash, self.mirror_hash)
+
+    def is_mirrored(self):
+        # Whether canonical_hash is the mirror image's hash, so moves stored
+        # under it must be mirrored with mirror_column
+        return self.mirror_hash < self.hash
+
+    def is_symmetric(self):
+        # A symmetric position's moves c and mirror_column(c) are worth the same
+        return self.hash == self.mirror_hash
+
+    def mirror_column(self, column):
+        return self.column_count - 1 - column
+
+    def mirrored(self):
+        # A new board of the same kind holding this position's mirror image
+        mirror = type(self)(self.row_count, self.column_count)
+        for r in range(self.row_count):
+            for c in range(self.column_count):
+                piece = int(self.grid[r, c])
+                if piece:
+                    mirror.drop_piece(r, self.mirror_column(c), piece)
+        return mirror
+
     def is_full(self):
         # Determine if every spot in the grid is filled
         return self.grid.all()
 
     def reset(self):
-        # Fill the grid with zeros for a new round
-        self.grid = np.zeros((self.row_count, self.column_count))
+        # Fill the grid with zeros for a new round, keeping the same array
+        self.grid.fill(0)
+        self.moves = []
+        self.hash = 0
+        self.mirror_hash = 0
 
     def print_grid(self):
         # Display the game's state in the console
         print(np.flip(self.grid, 0))
+
+
+class BitBoard(Board):
+    # Same interface as Board, but each player's pieces are also kept in a
+    # bitmask so win checks are a handful of shift-and-mask operations.
+    # Column c occupies bits c * (row_count + 1) .. c * (row_count + 1) + row_count,
+    # the extra top bit stays empty so lines never wrap into the next column.
+    def __init__(self, row_count, column_count):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.column_bits = row_count + 1
+        self.masks = [0, 0, 0]
+        self.heights = [0] * column_count
+        self._grid = np.zeros((row_count, column_count))
+        self.moves = []
+        self.zobrist = zobrist_keys(row_count, column_count)
+        self.hash = 0
+        self.mirror_hash = 0
+
+    @property
+    def grid(self):
+        # numpy view kept in sync with the masks for drawing and scoring
+        return self._grid
+
+    @grid.setter
+    def grid(self, values):
+        # Copy into the existing array so the grid object stays the same,
+        # then rebuild the masks and heights from it
+        np.copyto(self._grid, values)
+        self.moves = []
+        self.hash = 0
+        self.mirror_hash = 0
+        self.masks = [0, 0, 0]
+        self.heights = [0] * self.column_count
+        for r in range(self.row_count):
+            for c in range(self.column_count):
+                piece = int(self._grid[r, c])
+                if piece:
+                    self.masks[piece] |= 1 << (c * self.column_bits + r)
+                    self.hash ^= self.zobrist[r][c][piece]
+                    self.mirror_hash ^= self.zobrist[r][self.column_count - 1 - c][piece]
+                    self.heights[c] = max(self.heights[c], r + 1)
+
+    def is_valid_location(self, column):
+        return self.heights[column] < self.row_count
+
+    def get_next_open_row(self, column):
+        if self.heights[column] < self.row_count:
+            return self.heights[column]
+
+    def drop_piece(self, row, column, turn):
+        self._grid[row, column] = turn
+        self.hash ^= self.zobrist[row][column][turn]
+        self.mirror_hash ^= self.zobrist[row][self.column_count - 1 - column][turn]
+        self.masks[turn] |= 1 << (column * self.column_bits + row)
+        self.heights[column] = max(self.heights[column], row + 1)
+
+    def remove_piece(self, row, column):
+        piece = int(self._grid[row, column])
+        self._grid[row, column] = 0
+        self.hash ^= self.zobrist[row][column][piece]
+        self.mirror_hash ^= self.zobrist[row][self.column_count - 1 - column][piece]
+        self.masks[piece] &= ~(1 << (column * self.column_bits + row))
+        self.heights[column] = row
+
+    def has_four_in_a_row(self, turn):
+        mask = self.masks[turn]
+        # Vertical, horizontal, diagonally upward and diagonally downward
+        for shift in (1, self.column_bits, self.column_bits + 1, self.column_bits - 1):
+            pairs = mask & (mask >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
+    def wins_after(self, row, column, turn):
+        mask = self.masks[turn]
+        bit = 1 << (column * self.column_bits + row)
+        for shift in (1, self.column_bits, self.column_bits + 1, self.column_bits - 1):
+            pairs = mask & (mask >> shift)
+            starts = pairs & (pairs >> (2 * shift))
+            # A line through the point starts at most three steps before it
+            if starts & (bit | bit >> shift | bit >> (2 * shift) | bit >> (3 * shift)):
+                return True
+        return False
+
+    def is_full(self):
+        return all(height == self.row_count for height in self.heights)
+
+    def reset(self):
+        self.masks = [0, 0, 0]
+        self.heights = [0] * self.column_count
+        self._grid.fill(0)
+        self.moves = []
+        self.hash = 0
+        self.mirror_hash = 0
@@ -9,6 +9,7 @@ import greedy_ai
 import minimax_ai_H1
 import minimax_ai_H2
 import mcts_ai
+import opening_book
 import math
 import time
 
@@ -22,6 +23,16 @@ LIGHT_BG = (245, 245, 245)
 LIGHT_BLUE = (173, 216, 230)   
 WHITE = (255, 255, 255)
 
+# Seconds per move for the minimax players; None searches to a fixed depth
+MINIMAX_TIME_BUDGET = None
+
+# Worker processes used by the minimax players at a fixed depth
+MINIMAX_WORKERS = 1
+
+# Opening book files (built with opening_book.py). A minimax player takes its
+# moves from the book it built while the position is in it
+OPENING_BOOKS = []
+
 performance_stats = {
     "move_times": [],
     "ai_move_count": 0
@@ -31,7 +42,7 @@ performance_stats = {
 
 class Pane:
     def __init__(self, row_count, column_count, square_size):
-        self.board = board.Board(row_count, column_count)
+        self.board = board.BitBoard(row_count, column_count)
         self.square_size = square_size
         self.radius = square_size // 2 - 5
         self.width = column_count * square_size
@@ -124,6 +135,7 @@ def play_custom_game(pane, player1_type, player2_type):
     color_map = {1: RED, 2: YELLOW}
     player_types = {1: player1_type, 2: player2_type}
     move_count = 0  # Track total number of moves
+    mcts_players = {1: mcts_ai.MCTSPlayer(1), 2: mcts_ai.MCTSPlayer(2)}  # reuse search trees across turns
 
     while True:
         for event in pygame.event.get():
@@ -158,16 +170,30 @@ def play_custom_game(pane, player1_type, player2_type):
         else:
             pygame.time.wait(300)
             start_time = time.time()
-            if current_type == "RandomAI":
+            book_col = None
+            book_path = opening_book.book_for(OPENING_BOOKS, current_type)
+            if book_path is not None:
+                book_col = opening_book.book_move(book_path, pane.board, current_type)
+            if book_col is not None:
+                col = book_col
+            elif current_type == "RandomAI":
                 col = get_random_valid_column(pane.board)
             elif current_type == "GreedyAI":
                 col = greedy_ai.greedy_move(pane.board, piece=turn)
+            elif current_type == "MinimaxAI-H1" and MINIMAX_TIME_BUDGET is not None:
+                col, _ = minimax_ai_H1.iterative_deepening(pane.board, turn, MINIMAX_TIME_BUDGET)
+            elif current_type == "MinimaxAI-H1" and MINIMAX_WORKERS > 1:
+                col, _ = minimax_ai_H1.parallel_minimax(pane.board, 6, turn, MINIMAX_WORKERS)
             elif current_type == "MinimaxAI-H1":
                 col, _ = minimax_ai_H1.minimax(pane.board, depth=6, alpha=-math.inf, beta=math.inf, maximizingPlayer=True, piece=turn)
+            elif current_type == "MinimaxAI-H2" and MINIMAX_TIME_BUDGET is not None:
+                col, _ = minimax_ai_H2.iterative_deepening(pane.board, turn, MINIMAX_TIME_BUDGET)
+            elif current_type == "MinimaxAI-H2" and MINIMAX_WORKERS > 1:
+                col, _ = minimax_ai_H2.parallel_minimax(pane.board, 6, turn, MINIMAX_WORKERS)
             elif current_type == "MinimaxAI-H2":
                 col, _ = minimax_ai_H2.minimax(pane.board, depth=6, alpha=-math.inf, beta=math.inf, maximizingPlayer=True, piece=turn)
             elif current_type == "MCTS":
-                col = mcts_ai.mcts_move(pane.board, turn)
+                col, _ = mcts_players[turn].move(pane.board)
             else:
                 print(f"Unknown player type: {current_type}")
                 sys.exit()
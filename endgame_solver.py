@@ -0,0 +1,224 @@
+import collections
+import time
+import transposition
+
+# Positions with at most this many empty cells are solved exactly by the
+# minimax and MCTS agents instead of searched heuristically; 0 turns it off.
+# From an empty table a solve takes at most about 0.03 s at 16 empty cells,
+# 0.06 s at 18 and 0.2 s at 20, close to the agents' 0.25 s per move.
+EMPTY_CELL_THRESHOLD = 16
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# outcome and distance are from the point of view of the player to move;
+# distance counts plies up to and including the move that ends the game
+Solution = collections.namedtuple("Solution", ["move", "outcome", "distance", "score", "nodes", "time",
+                                               "nodes_per_second"])
+
+# Nodes and time over all solves since the process started
+solver_stats = {"solves": 0, "nodes": 0, "time": 0.0}
+
+# Keys are raw bitboards, whose low bits only cover the first columns, so the
+# table size is a prime to make every bit count towards the slot
+TABLE_SIZE = (1 << 20) + 7
+
+# Positions are exact, so entries never go stale and the table is kept
+# between solves. A slot holds an upper or lower bound on the score, with the
+# number of empty cells as its depth.
+table = transposition.TranspositionTable(TABLE_SIZE)
+
+
+class Position:
+    # The bitboard layout of board.BitBoard: column c holds bits
+    # c * (row_count + 1) .. c * (row_count + 1) + row_count, top bit empty.
+    # current holds the pieces of the player to move and mask all pieces, so
+    # current + mask identifies the position.
+    def __init__(self, row_count, column_count):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.column_bits = row_count + 1
+        self.size = row_count * column_count
+        self.bottom_mask = sum(1 << (c * self.column_bits) for c in range(column_count))
+        self.board_mask = self.bottom_mask * ((1 << row_count) - 1)
+        self.column_masks = [((1 << row_count) - 1) << (c * self.column_bits) for c in range(column_count)]
+        # Center columns first
+        self.column_order = sorted(range(column_count), key=lambda c: abs(c - (column_count - 1) / 2))
+        self.nodes = 0
+
+    def winning_cells(self, position, mask):
+        # Empty cells where a piece would complete four for the owner of position
+        # Vertical
+        cells = (position << 1) & (position << 2) & (position << 3)
+        # Horizontal, then both diagonals
+        for shift in (self.column_bits, self.column_bits - 1, self.column_bits + 1):
+            pair = (position << shift) & (position << (2 * shift))
+            cells |= pair & (position << (3 * shift))
+            cells |= pair & (position >> shift)
+            pair = (position >> shift) & (position >> (2 * shift))
+            cells |= pair & (position << shift)
+            cells |= pair & (position >> (3 * shift))
+        return cells & (self.board_mask ^ mask)
+
+    def can_win_next(self, current, mask):
+        return self.winning_cells(current, mask) & ((mask + self.bottom_mask) & self.board_mask)
+
+    def non_losing_moves(self, current, mask):
+        # Playable cells that do not hand the opponent an immediate win. When
+        # the opponent threatens two cells at once there are none.
+        possible = (mask + self.bottom_mask) & self.board_mask
+        opponent_wins = self.winning_cells(current ^ mask, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return 0
+            possible = forced
+        # Never play directly below a cell the opponent would win on
+        return possible & ~(opponent_wins >> 1)
+
+    def negamax(self, current, mask, moves, alpha, beta):
+        # Score of the position for the player to move, who cannot win with
+        # their next move, searched within (alpha, beta)
+        self.nodes += 1
+        possible = self.non_losing_moves(current, mask)
+        if not possible:
+            return -((self.size - moves) // 2)
+        if moves >= self.size - 2:
+            return 0
+
+        lowest = -((self.size - 2 - moves) // 2)
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (self.size - 1 - moves) // 2
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        key = current + mask
+        entry = table.probe(key)
+        if entry is not None:
+            if entry[2] == transposition.UPPER_BOUND:
+                if beta > entry[3]:
+                    beta = entry[3]
+                    if alpha >= beta:
+                        return beta
+            elif alpha < entry[3]:
+                alpha = entry[3]
+                if alpha >= beta:
+                    return alpha
+
+        # Moves that create the most threats of our own first
+        children = []
+        for i, c in enumerate(self.column_order):
+            move = possible & self.column_masks[c]
+            if move:
+                threats = bin(self.winning_cells(current | move, mask)).count("1")
+                children.append((-threats, i, move))
+        children.sort()
+
+        for _, _, move in children:
+            # After the move the opponent is to move and current becomes theirs
+            score = -self.negamax(current ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                table.store(key, self.size - moves, transposition.LOWER_BOUND, score, None)
+                return score
+            if score > alpha:
+                alpha = score
+        table.store(key, self.size - moves, transposition.UPPER_BOUND, alpha, None)
+        return alpha
+
+    def score(self, current, mask, moves, alpha, beta):
+        # negamax, also for positions the player to move wins at once
+        if self.can_win_next(current, mask):
+            return (self.size + 1 - moves) // 2
+        return self.negamax(current, mask, moves, alpha, beta)
+
+    def solve(self, current, mask, moves):
+        # Exact score, found by narrowing [lowest, highest] with null-window
+        # searches, which cut far more than one search with a wide window
+        if self.can_win_next(current, mask):
+            return (self.size + 1 - moves) // 2
+        lowest = -((self.size - moves) // 2)
+        highest = (self.size + 1 - moves) // 2
+        while lowest < highest:
+            middle = lowest + (highest - lowest) // 2
+            # Try small windows around 0 first, where most positions end up
+            if middle <= 0 and lowest // 2 < middle:
+                middle = lowest // 2
+            elif middle >= 0 and highest // 2 > middle:
+                middle = highest // 2
+            result = self.negamax(current, mask, moves, middle, middle + 1)
+            if result <= middle:
+                highest = result
+            else:
+                lowest = result
+        return lowest
+
+    def distance(self, score, moves):
+        # Plies from a position with moves pieces until the game ends, for a
+        # position with the given exact score. A win on the piece numbered n
+        # scores (size + 2 - n) // 2 for the winner.
+        if score == 0:
+            return self.size - moves
+        end = self.size + 2 - 2 * abs(score)
+        # The winning piece is numbered moves + 1 (mod 2) for a win, moves for a loss
+        if (end - (moves + 1 if score > 0 else moves)) % 2:
+            end -= 1
+        return end - moves
+
+
+def empty_cells(board_obj):
+    return int((board_obj.grid == 0).sum())
+
+def in_range(board_obj):
+    # Whether the agents should hand the position to the solver: close enough
+    # to the end and not already over
+    return 0 < empty_cells(board_obj) <= EMPTY_CELL_THRESHOLD and not board_obj.has_four_in_a_row(1) and \
+        not board_obj.has_four_in_a_row(2)
+
+def solve(board_obj, piece):
+    # Best move for piece, who is to move on board_obj, with the exact result
+    # under perfect play. The position must not already be won. Ties between
+    # moves go to the one closest to the center.
+    start_time = time.monotonic()
+    position = Position(board_obj.row_count, board_obj.column_count)
+    current = mask = 0
+    for r in range(board_obj.row_count):
+        for c in range(board_obj.column_count):
+            cell = int(board_obj.grid[r, c])
+            if cell:
+                bit = 1 << (c * position.column_bits + r)
+                mask |= bit
+                if cell == piece:
+                    current |= bit
+    moves = bin(mask).count("1")
+
+    score = position.solve(current, mask, moves)
+    possible = (mask + position.bottom_mask) & position.board_mask
+    best_move = None
+    for c in position.column_order:
+        move = possible & position.column_masks[c]
+        if not move:
+            continue
+        if best_move is None:
+            best_move = c
+        # A winning move is always best, otherwise a move is best if the
+        # opponent's score after it is at most -score
+        if position.winning_cells(current, mask) & move:
+            best_move = c
+            break
+        if -position.score(current ^ mask, mask | move, moves + 1, -score, -score + 1) >= score:
+            best_move = c
+            break
+
+    elapsed = time.monotonic() - start_time
+    solver_stats["solves"] += 1
+    solver_stats["nodes"] += position.nodes
+    solver_stats["time"] += elapsed
+    outcome = WIN if score > 0 else LOSS if score < 0 else DRAW
+    return Solution(best_move, outcome, position.distance(score, moves), score, position.nodes, elapsed,
+                    position.nodes / elapsed if elapsed > 0 else 0.0)
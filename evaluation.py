@@ -0,0 +1,183 @@
+import collections
+import functools
+import zlib
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def window_indices(row_count, column_count):
+    # Flat grid indices of every window of four cells, one row per window
+    windows = []
+    # Horizontal
+    for r in range(row_count):
+        for c in range(column_count - 3):
+            windows.append([(r, c + i) for i in range(4)])
+    # Vertical
+    for c in range(column_count):
+        for r in range(row_count - 3):
+            windows.append([(r + i, c) for i in range(4)])
+    # Positive diagonals
+    for r in range(row_count - 3):
+        for c in range(column_count - 3):
+            windows.append([(r + i, c + i) for i in range(4)])
+    # Negative diagonals
+    for r in range(3, row_count):
+        for c in range(column_count - 3):
+            windows.append([(r - i, c + i) for i in range(4)])
+    return np.array([[r * column_count + c for r, c in window] for window in windows], dtype=np.intp)
+
+
+def window_score_table(evaluate_window):
+    # table[own, opp] is what evaluate_window gives a window holding own pieces
+    # of the scoring player and opp pieces of the opponent
+    table = np.zeros((5, 5), dtype=np.int64)
+    for own in range(5):
+        for opp in range(5 - own):
+            window = [1] * own + [2] * opp + [0] * (4 - own - opp)
+            table[own, opp] = evaluate_window(window, 1)
+    return table
+
+
+# Weight of each cell value (empty, piece 1, piece 2) from the scoring piece's
+# point of view, chosen so a window's summed weights are own * 5 + opp, which
+# is its index into the flattened score table
+CELL_WEIGHTS = {
+    1: np.array([0, 5, 1], dtype=np.intp),
+    2: np.array([0, 1, 5], dtype=np.intp)
+}
+
+
+def score_grid(grid, piece, table, center_weight=0):
+    # Same result as summing evaluate_window over every window, done with one
+    # gather and a table lookup instead of Python loops
+    cells = CELL_WEIGHTS[piece][grid.ravel().astype(np.intp)]
+    codes = cells[window_indices(*grid.shape)].sum(axis=1)
+    score = int(table.ravel()[codes].sum())
+    if center_weight:
+        score += center_weight * int(np.count_nonzero(grid[:, grid.shape[1] // 2] == piece))
+    return score
+
+
+@functools.lru_cache(maxsize=None)
+def cell_windows(row_count, column_count):
+    # For each flat cell index, the windows passing through it
+    windows = [[] for _ in range(row_count * column_count)]
+    for w, cells in enumerate(window_indices(row_count, column_count).tolist()):
+        for cell in cells:
+            windows[cell].append(w)
+    return tuple(tuple(cell) for cell in windows)
+
+
+class IncrementalEvaluator:
+    # Keeps every window's contents and the running score for both pieces up to
+    # date as pieces are added and removed, so reading a score is O(1). A
+    # window's contents are stored as count1 * 5 + count2, and the score
+    # tables are indexed by that code for each piece's point of view.
+    def __init__(self, board_obj, table, center_weight=0, name=None):
+        self.name = name
+        # Stands in for name in transposition keys: str hashes change from one
+        # interpreter run to the next, which would change which entries collide
+        self.name_key = zlib.crc32(name.encode("utf-8")) if name else 0
+        self.column_count = board_obj.column_count
+        self.center_column = board_obj.column_count // 2
+        self.center_weight = center_weight
+        self.cell_windows = cell_windows(board_obj.row_count, board_obj.column_count)
+        self.tables = [None, table.ravel().tolist(), table.T.ravel().tolist()]
+        self.reset(board_obj)
+
+    def reset(self, board_obj):
+        # Rebuild the window codes and scores from the board's grid
+        self.codes = [0] * len(window_indices(board_obj.row_count, board_obj.column_count))
+        self.scores = [0, self.tables[1][0] * len(self.codes), self.tables[2][0] * len(self.codes)]
+        for r in range(board_obj.row_count):
+            for c in range(board_obj.column_count):
+                piece = int(board_obj.grid[r, c])
+                if piece:
+                    self.add(r, c, piece)
+
+    def add(self, row, column, turn):
+        self._update(row, column, turn, 5 if turn == 1 else 1)
+
+    def remove(self, row, column, turn):
+        self._update(row, column, turn, -5 if turn == 1 else -1)
+
+    def _update(self, row, column, turn, step):
+        codes = self.codes
+        table1 = self.tables[1]
+        table2 = self.tables[2]
+        score1, score2 = self.scores[1], self.scores[2]
+        for w in self.cell_windows[row * self.column_count + column]:
+            code = codes[w]
+            score1 -= table1[code]
+            score2 -= table2[code]
+            code += step
+            score1 += table1[code]
+            score2 += table2[code]
+            codes[w] = code
+        self.scores[1], self.scores[2] = score1, score2
+        if column == self.center_column:
+            self.scores[turn] += self.center_weight if step > 0 else -self.center_weight
+
+    def score(self, piece):
+        return self.scores[piece]
+
+
+CACHE_SIZE = 1 << 16  # positions kept by the evaluation cache
+
+
+class EvaluationCache:
+    # Least recently used scores, keyed by a namespace (the heuristic's module
+    # name, so heuristics never see each other's scores) and the position's
+    # piece and canonical hash, which a position shares with its mirror image.
+    # Every heuristic is left-right symmetric, so both share one score.
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.counters = {}  # namespace -> {"hits", "misses", "evictions"}
+
+    def _counters(self, namespace):
+        if namespace not in self.counters:
+            self.counters[namespace] = {"hits": 0, "misses": 0, "evictions": 0}
+        return self.counters[namespace]
+
+    def get(self, namespace, key):
+        # The cached score, or None
+        score = self.entries.get((namespace, key))
+        if score is None:
+            self._counters(namespace)["misses"] += 1
+            return None
+        self.entries.move_to_end((namespace, key))
+        self._counters(namespace)["hits"] += 1
+        return score
+
+    def put(self, namespace, key, score):
+        self.entries[(namespace, key)] = score
+        self.entries.move_to_end((namespace, key))
+        if len(self.entries) > self.size:
+            (evicted, _), _ = self.entries.popitem(last=False)
+            self._counters(evicted)["evictions"] += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.counters = {}
+
+    def stats(self, namespace=None):
+        # Counters for one namespace, or summed over all of them
+        if namespace is not None:
+            counters = dict(self._counters(namespace))
+        else:
+            counters = {"hits": 0, "misses": 0, "evictions": 0}
+            for namespace_counters in self.counters.values():
+                for name, count in namespace_counters.items():
+                    counters[name] += count
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        counters["entries"] = len(self.entries)
+        counters["size"] = self.size
+        return counters
+
+
+# Shared by every agent that caches scores. Only greedy does: minimax reads
+# its leaf scores from an IncrementalEvaluator in O(1), cheaper than a probe.
+shared_cache = EvaluationCache()
+
@@ -0,0 +1,77 @@
+import collections
+import os
+import struct
+
+# File layout: MAGIC once, then one record per game, appended as games finish.
+# A record is a HEADER (payload length, winner, move count, seed) followed by
+# the payload: one byte per move (the column), one float32 per move (seconds
+# taken), then each agent's name as a length byte and UTF-8 bytes.
+MAGIC = b"C4GR\x01"
+HEADER = struct.Struct("<HBBQ")
+
+GameRecord = collections.namedtuple("GameRecord", ["moves", "winner", "move_times", "agents", "seed"])
+
+
+class GameRecordWriter:
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+            self.file.flush()
+
+    def write(self, moves, winner, move_times, agents, seed=0):
+        # move_times holds the seconds taken for each move in moves, in order
+        payload = bytes(moves) + struct.pack(f"<{len(moves)}f", *move_times)
+        for agent in agents:
+            name = agent.encode("utf-8")
+            payload += bytes([len(name)]) + name
+        self.file.write(HEADER.pack(len(payload), winner, len(moves), seed) + payload)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(path):
+    # Yield the records one at a time so large files never sit in memory
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a game record file")
+        while True:
+            header = f.read(HEADER.size)
+            if not header:
+                return
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path} ends in the middle of a record")
+            length, winner, move_count, seed = HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                raise ValueError(f"{path} ends in the middle of a record")
+            moves = tuple(payload[:move_count])
+            offset = move_count + 4 * move_count
+            move_times = struct.unpack(f"<{move_count}f", payload[move_count:offset])
+            agents = []
+            while offset < length:
+                name_length = payload[offset]
+                agents.append(payload[offset + 1:offset + 1 + name_length].decode("utf-8"))
+                offset += 1 + name_length
+            yield GameRecord(moves, winner, move_times, tuple(agents), seed)
+
+
+def count_records(path):
+    # Number of games in a file, skipping over payloads without decoding them
+    count = 0
+    with open(path, "rb") as f:
+        f.seek(len(MAGIC))
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            length = HEADER.unpack(f.read(HEADER.size))[0]
+            f.seek(length, os.SEEK_CUR)
+            count += 1
+    return count
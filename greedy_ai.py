@@ -1,7 +1,7 @@
 
 import math
-import random
-import numpy as np
+import evaluation
+import seeding
 
 def evaluate_window(window, piece):
     score = 0
@@ -21,44 +21,11 @@ def evaluate_window(window, piece):
 
     return score
 
-def score_position(board, piece):
-    score = 0
-    ROW_COUNT = board.shape[0]
-    COLUMN_COUNT = board.shape[1]
-
-    # Score center column a bit (encourages middle play)
-    center_col = COLUMN_COUNT // 2
-    center_array = list(board[:, center_col])
-    center_count = center_array.count(piece)
-    score += center_count * 2
-
-    # Score horizontal
-    for r in range(ROW_COUNT):
-        row_array = list(board[r, :])
-        for c in range(COLUMN_COUNT - 3):
-            window = row_array[c:c+4]
-            score += evaluate_window(window, piece)
-
-    # Score vertical
-    for c in range(COLUMN_COUNT):
-        col_array = list(board[:, c])
-        for r in range(ROW_COUNT - 3):
-            window = col_array[r:r+4]
-            score += evaluate_window(window, piece)
+# Scores of evaluate_window by (own pieces, opponent pieces) in the window
+WINDOW_SCORES = evaluation.window_score_table(evaluate_window)
 
-    # Score positive diagonals
-    for r in range(ROW_COUNT - 3):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r+i][c+i] for i in range(4)]
-            score += evaluate_window(window, piece)
-
-    # Score negative diagonals
-    for r in range(3, ROW_COUNT):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r-i][c+i] for i in range(4)]
-            score += evaluate_window(window, piece)
-
-    return score
+def score_position(board, piece):
+    return evaluation.score_grid(board, piece, WINDOW_SCORES, center_weight=2)
 
 def is_terminal_node(board_obj):
     return board_obj.has_four_in_a_row(1) or board_obj.has_four_in_a_row(2) or board_obj.is_full()
@@ -66,17 +33,27 @@ def is_terminal_node(board_obj):
 def get_valid_locations(board_obj):
     return [col for col in range(board_obj.column_count) if board_obj.is_valid_location(col)]
 
-def greedy_move(board_obj, piece):
+def greedy_move(board_obj, piece, rng=None):
+    rng = seeding.make_rng(rng)
     valid_locations = get_valid_locations(board_obj)
     best_score = -math.inf
-    best_col = random.choice(valid_locations)  # fallback
+    best_col = rng.choice(valid_locations)  # fallback
 
+    evaluator = None  # only built if some move's score is not cached
     for col in valid_locations:
-        row = board_obj.get_next_open_row(col)
-        temp_board = np.copy(board_obj.grid)
-        board_obj.drop_piece(row, col, piece)
-        score = score_position(board_obj.grid, piece)
-        board_obj.grid = temp_board  # restore original state
+        row = board_obj.play(col, piece)
+        key = (piece, board_obj.canonical_hash())
+        score = evaluation.shared_cache.get(__name__, key)
+        if score is None:
+            if evaluator is None:
+                board_obj.undo()
+                evaluator = evaluation.IncrementalEvaluator(board_obj, WINDOW_SCORES, center_weight=2, name=__name__)
+                row = board_obj.play(col, piece)
+            evaluator.add(row, col, piece)
+            score = evaluator.score(piece)
+            evaluator.remove(row, col, piece)
+            evaluation.shared_cache.put(__name__, key, score)
+        board_obj.undo()  # restore original state
 
         if score > best_score:
             best_score = score
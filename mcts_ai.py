@@ -2,83 +2,406 @@ import copy
 import math
 import random
 import time
+import numpy as np
+import batch_rollout
+import endgame_solver
+import seeding
+import worker_pool
 
 SIMULATION_TIME = 0.25  # seconds to simulate
+LEAF_BATCH_SIZE = 64  # leaves selected per round by the batched search
+EARLY_STOP_INTERVAL = 64  # playouts between checks whether the best move is settled
+
+# Expand only one of each pair of mirrored moves in left-right symmetric
+# positions, since both lead to positions of equal value
+SYMMETRY_PRUNING = True
+
+PROVEN_WIN = 1  # the move leading to the node wins with best play
+PROVEN_LOSS = -1  # the move leading to the node loses with best play
 
 class Node:
-    def __init__(self, board_obj, parent=None, move=None, player=1):
-        self.board = copy.deepcopy(board_obj)
+    # Nodes hold no board. The position of a node is reached by replaying the
+    # moves on the path from the root onto one scratch board. wins and proven
+    # are from the point of view of the player who made the move leading here.
+    __slots__ = ("parent", "move", "player", "winner", "proven", "children", "visits", "wins")
+
+    def __init__(self, parent=None, move=None, player=1, winner=0):
         self.parent = parent
         self.move = move
-        self.player = player
+        self.player = player  # piece to move in this position
+        self.winner = winner  # piece that won with the move leading here, else 0
+        self.proven = PROVEN_WIN if winner else 0
         self.children = []
         self.visits = 0
         self.wins = 0
 
-    def expand(self):
-        valid_moves = [c for c in range(self.board.column_count) if self.board.is_valid_location(c)]
+    def expand(self, board_obj):
+        # board_obj must be at this node's position
+        valid_moves = [c for c in range(board_obj.column_count) if board_obj.is_valid_location(c)]
+        if SYMMETRY_PRUNING and board_obj.is_symmetric():
+            valid_moves = [c for c in valid_moves if c <= board_obj.mirror_column(c)]
         for col in valid_moves:
-            new_board = copy.deepcopy(self.board)
-            row = new_board.get_next_open_row(col)
-            new_board.drop_piece(row, col, self.player)
-            child = Node(new_board, parent=self, move=col, player=3 - self.player)
-            self.children.append(child)
+            row = board_obj.play(col, self.player)
+            winner = self.player if board_obj.wins_after(row, col, self.player) else 0
+            board_obj.undo()
+            self.children.append(Node(parent=self, move=col, player=3 - self.player, winner=winner))
 
     def is_fully_expanded(self):
         return len(self.children) > 0
 
-    def best_child(self, c_param=1.41):
-        unvisited = [child for child in self.children if child.visits == 0]
+    def best_child(self, c_param=1.41, rng=random):
+        # Proven children need no more playouts and are left out
+        children = [child for child in self.children if not child.proven]
+        if not children:
+            return None
+        unvisited = [child for child in children if child.visits == 0]
         if unvisited:
-            return random.choice(unvisited)
+            return rng.choice(unvisited)
+
+        log_visits = math.log(self.visits)
+        return max(children, key=lambda node:
+            node.wins / node.visits + c_param * math.sqrt(log_visits / node.visits))
 
-        return max(self.children, key=lambda node:
-            node.wins / node.visits + c_param * math.sqrt(math.log(self.visits) / node.visits))
+    def best_move(self):
+        # A proven win if there is one, otherwise the most visited move that
+        # is not a proven loss
+        for child in self.children:
+            if child.proven == PROVEN_WIN:
+                return child
+        candidates = [child for child in self.children if child.proven != PROVEN_LOSS] or self.children
+        return max(candidates, key=lambda n: n.visits)
 
 
-def simulate_game(board_obj, player):
-    temp_board = copy.deepcopy(board_obj)
+def random_playout(board_obj, player, rng=random):
+    # Play random moves until the game ends, then take them all back so
+    # board_obj is left as it was
+    move_count = len(board_obj.moves)
+    valid_cols = [c for c in range(board_obj.column_count) if board_obj.is_valid_location(c)]
     current_player = player
-    while not temp_board.is_full():
-        if temp_board.has_four_in_a_row(1):
-            return 1
-        elif temp_board.has_four_in_a_row(2):
-            return 2
-        valid_cols = [c for c in range(temp_board.column_count) if temp_board.is_valid_location(c)]
-        col = random.choice(valid_cols)
-        row = temp_board.get_next_open_row(col)
-        temp_board.drop_piece(row, col, current_player)
+    result = 0  # Draw
+    while valid_cols:
+        col = rng.choice(valid_cols)
+        row = board_obj.play(col, current_player)
+        if board_obj.wins_after(row, col, current_player):
+            result = current_player
+            break
+        if not board_obj.is_valid_location(col):
+            valid_cols.remove(col)
         current_player = 3 - current_player
-    return 0  # Draw
+    while len(board_obj.moves) > move_count:
+        board_obj.undo()
+    return result
 
-def mcts_move(board_obj, piece):
-    root = Node(board_obj, player=piece)
-    start_time = time.time()
+class SearchBudget:
+    # Decides when a search stops: after time_budget seconds on the monotonic
+    # clock, after a number of playouts, once the root's value is proven, or,
+    # with early_stop, once the most visited root move can no longer be
+    # overtaken in the playouts left.
+    # With neither limit given the search runs for SIMULATION_TIME.
+    def __init__(self, time_budget=None, iterations=None, early_stop=True):
+        if time_budget is None and iterations is None:
+            time_budget = SIMULATION_TIME
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.early_stop = early_stop
+        self.start_time = time.monotonic()
+        self.playouts = 0
+        self.next_check = EARLY_STOP_INTERVAL
+        self.stopped_early = False
 
-    while time.time() - start_time < SIMULATION_TIME:
-        node = root
-        # Selection
-        while node.is_fully_expanded() and node.children:
-            node = node.best_child()
+    def exhausted(self, root):
+        if root.proven:
+            return True
+        if self.iterations is not None and self.playouts >= self.iterations:
+            return True
+        elapsed = time.monotonic() - self.start_time
+        if self.time_budget is not None and elapsed >= self.time_budget:
+            return True
+        if self.early_stop and root.children and self.playouts >= self.next_check:
+            self.next_check = self.playouts + EARLY_STOP_INTERVAL
+            remaining = math.inf
+            if self.iterations is not None:
+                remaining = self.iterations - self.playouts
+            if self.time_budget is not None and elapsed > 0:
+                remaining = min(remaining, self.playouts / elapsed * (self.time_budget - elapsed))
+            visits = sorted((child.visits for child in root.children), reverse=True) + [0]
+            if visits[0] - visits[1] > remaining:
+                self.stopped_early = True
+                return True
+        return False
 
-        # Expansion
-        if not node.is_fully_expanded():
-            node.expand()
+    def info(self, root):
+        elapsed = time.monotonic() - self.start_time
+        return {
+            "visits": {child.move: child.visits for child in root.children},
+            "proven": {child.move: child.proven for child in root.children},
+            "playouts": self.playouts,
+            "time": elapsed,
+            "playouts_per_second": self.playouts / elapsed if elapsed > 0 else 0.0,
+            "stopped_early": self.stopped_early
+        }
 
-        # Simulation
-        if node.children:
-            node = random.choice(node.children)
 
-        result = simulate_game(node.board, node.player)
+def backpropagate(node, result):
+    while node is not None:
+        node.visits += 1
+        if result == 3 - node.player:
+            node.wins += 1
+        elif result == node.player:
+            node.wins -= 1
+        node = node.parent
+
+def add_virtual_loss(node, amount):
+    # Count amount pending playouts as losses for every move on the path
+    while node is not None:
+        node.visits += amount
+        node.wins -= amount
+        node = node.parent
+
+def propagate_proof(node):
+    # Called after node's children change: a position where the player to
+    # move has a winning move is lost for whoever moved into it, and one where
+    # every move loses is won for them. Walk up while that settles parents.
+    while node is not None and node.children and not node.proven:
+        if any(child.proven == PROVEN_WIN for child in node.children):
+            node.proven = PROVEN_LOSS
+        elif all(child.proven == PROVEN_LOSS for child in node.children):
+            node.proven = PROVEN_WIN
+        else:
+            break
+        node = node.parent
+
+def select_leaf(root, scratch, rng=random):
+    # Descend from root to a node without children, expand it and step into
+    # one of its children, playing the moves on scratch
+    node = root
+    while node.is_fully_expanded():
+        child = node.best_child(rng=rng)
+        if child is None:
+            break
+        node = child
+        scratch.play(node.move, 3 - node.player)
+
+    if not node.winner and not node.is_fully_expanded():
+        node.expand(scratch)
+        propagate_proof(node)
+
+    if not node.winner and node.children:
+        node = rng.choice(node.children)
+        scratch.play(node.move, 3 - node.player)
+    return node
+
+def run_search(root, board_obj, budget, rng=random):
+    # Grow the tree under root, whose position is board_obj, until the budget
+    # runs out or the root's value is proven. rng makes every random choice.
+    scratch = copy.deepcopy(board_obj)
+    root_move_count = len(scratch.moves)
+
+    while not budget.exhausted(root):
+        # Selection, expansion and the step into a child to simulate from
+        node = select_leaf(root, scratch, rng)
+
+        # Simulation
+        result = node.winner if node.winner else random_playout(scratch, node.player, rng)
+        while len(scratch.moves) > root_move_count:
+            scratch.undo()
 
         # Backpropagation
-        while node is not None:
-            node.visits += 1
-            if result == piece:
-                node.wins += 1
-            elif result == 3 - piece:
-                node.wins -= 1
-            node = node.parent
-
-    best = max(root.children, key=lambda n: n.visits)
-    return best.move
+        backpropagate(node, result)
+        budget.playouts += 1
+
+def batch_playout_worker(grids, players, seed):
+    # Runs in a worker process: play out a share of a batch of leaves
+    return batch_rollout.batch_rollouts(grids, players, np.random.default_rng(seed))
+
+def run_batch_search(root, board_obj, budget, workers=1, batch_size=LEAF_BATCH_SIZE, rng=random):
+    # Like run_search, but each round selects batch_size leaves from the tree
+    # and plays them all out together with batch_rollout, split over the
+    # worker processes when there is more than one. Each selected path gets a
+    # virtual loss until its result arrives so the batch spreads over
+    # different leaves.
+    scratch = copy.deepcopy(board_obj)
+    root_move_count = len(scratch.moves)
+    numpy_rng = seeding.make_numpy_rng(rng)
+
+    while not budget.exhausted(root):
+        leaves = []
+        grids = []
+        if budget.iterations is not None:
+            batch_size = min(batch_size, budget.iterations - budget.playouts)
+        for _ in range(batch_size):
+            if root.proven:
+                break
+            node = select_leaf(root, scratch, rng)
+            if not node.winner:
+                grids.append(scratch.grid.copy())
+            while len(scratch.moves) > root_move_count:
+                scratch.undo()
+            add_virtual_loss(node, 1)
+            leaves.append(node)
+
+        players = [node.player for node in leaves if not node.winner]
+        if workers > 1 and len(grids) > 1:
+            executor = worker_pool.get_executor(workers)
+            chunk_size = -(-len(grids) // workers)
+            futures = [executor.submit(batch_playout_worker, grids[i:i + chunk_size], players[i:i + chunk_size],
+                                       rng.getrandbits(64))
+                       for i in range(0, len(grids), chunk_size)]
+            results = [result for future in futures for result in future.result().tolist()]
+        elif grids:
+            results = batch_rollout.batch_rollouts(grids, players, numpy_rng).tolist()
+        else:
+            results = []
+
+        results = iter(results)
+        for node in leaves:
+            add_virtual_loss(node, -1)
+            backpropagate(node, node.winner if node.winner else next(results))
+        budget.playouts += len(leaves)
+
+def solve_endgame(board_obj, piece):
+    # Near the end of the game the solver's move replaces the search. Returns
+    # (move, info) like mcts_move, with the solution in info, or None when
+    # the position is outside the solver's range.
+    if not endgame_solver.in_range(board_obj):
+        return None
+    solution = endgame_solver.solve(board_obj, piece)
+    proven = {endgame_solver.WIN: PROVEN_WIN, endgame_solver.LOSS: PROVEN_LOSS}.get(solution.outcome, 0)
+    info = {
+        "visits": {},
+        "proven": {solution.move: proven} if proven else {},
+        "playouts": 0,
+        "time": solution.time,
+        "playouts_per_second": 0.0,
+        "stopped_early": False,
+        "solution": solution
+    }
+    return solution.move, info
+
+def mcts_move(board_obj, piece, workers=1, batched=False, time_budget=None, iterations=None, early_stop=True,
+              rng=None):
+    # Returns the most visited move and the search info: visit counts per root
+    # move, playouts, time and playouts per second. Batched search plays
+    # leaves out in vectorized batches; with several workers those batches are
+    # also spread over processes. With an iteration cap and a seeded rng the
+    # search is reproducible.
+    solved = solve_endgame(board_obj, piece)
+    if solved is not None:
+        return solved
+    rng = seeding.make_rng(rng)
+    root = Node(player=piece)
+    budget = SearchBudget(time_budget, iterations, early_stop)
+    if workers > 1 or batched:
+        run_batch_search(root, board_obj, budget, workers, rng=rng)
+    else:
+        run_search(root, board_obj, budget, rng)
+    return root.best_move().move, budget.info(root)
+
+def search_worker(board_obj, piece, seed, time_budget, iterations, early_stop):
+    # Runs in a worker process: grow an independent tree and report its info
+    root = Node(player=piece)
+    budget = SearchBudget(time_budget, iterations, early_stop)
+    run_search(root, board_obj, budget, random.Random(seed))
+    return budget.info(root)
+
+def root_parallel_move(board_obj, piece, workers, time_budget=None, iterations=None, early_stop=True, rng=None):
+    # Grow one tree per worker, splitting any playout cap between them, and
+    # pick the move with the most visits summed over all trees
+    solved = solve_endgame(board_obj, piece)
+    if solved is not None:
+        return solved
+    rng = seeding.make_rng(rng)
+    executor = worker_pool.get_executor(workers)
+    if iterations is not None:
+        iterations = -(-iterations // workers)
+    start_time = time.monotonic()
+    futures = [executor.submit(search_worker, board_obj, piece, rng.getrandbits(64), time_budget, iterations,
+                               early_stop)
+               for _ in range(workers)]
+    info = {"visits": {}, "proven": {}, "playouts": 0, "stopped_early": False}
+    for future in futures:
+        worker_info = future.result()
+        for move, child_visits in worker_info["visits"].items():
+            info["visits"][move] = info["visits"].get(move, 0) + child_visits
+        for move, proven in worker_info["proven"].items():
+            if proven:
+                info["proven"][move] = proven
+        info["playouts"] += worker_info["playouts"]
+        info["stopped_early"] = info["stopped_early"] or worker_info["stopped_early"]
+    info["time"] = time.monotonic() - start_time
+    info["playouts_per_second"] = info["playouts"] / info["time"] if info["time"] > 0 else 0.0
+
+    # Any tree's proof holds for all of them
+    for move, proven in info["proven"].items():
+        if proven == PROVEN_WIN:
+            return move, info
+    candidates = [move for move in info["visits"] if info["proven"].get(move) != PROVEN_LOSS] or list(info["visits"])
+    return max(candidates, key=info["visits"].get), info
+
+
+class MCTSPlayer:
+    # Keeps its tree between turns. Each call moves the root down through our
+    # previous move and the opponent's reply, dropping the rest of the tree,
+    # so the search starts with the statistics already gathered below it.
+    # Symmetric positions only have children for one of each pair of mirrored
+    # moves, so a reply in the other column continues in the mirror image's
+    # subtree, and from then on the tree is the board's mirror image.
+    def __init__(self, piece):
+        self.piece = piece
+        self.root = None
+        self.grid = None  # position the root stands for, as of our last move
+        self.mirrored = False  # whether the tree's columns are mirrored from the board's
+        self.reused_visits = 0
+
+    def advance(self, board_obj):
+        # Find the root for board_obj, reusing the old subtree when exactly one
+        # opponent piece was added since our last move
+        if self.root is not None and self.grid is not None and self.grid.shape == board_obj.grid.shape:
+            changed = np.argwhere(board_obj.grid != self.grid)
+            if len(changed) == 1:
+                row, col = changed[0]
+                if self.grid[row, col] == 0 and board_obj.grid[row, col] == 3 - self.piece:
+                    col = board_obj.mirror_column(col) if self.mirrored else col
+                    children = {child.move: child for child in self.root.children}
+                    if col not in children and np.array_equal(self.grid, self.grid[:, ::-1]):
+                        col = board_obj.mirror_column(col)
+                        self.mirrored = not self.mirrored
+                    if col in children:
+                        children[col].parent = None
+                        return children[col]
+        self.mirrored = False
+        return Node(player=self.piece)
+
+    def move(self, board_obj, workers=1, batched=False, time_budget=None, iterations=None, early_stop=True,
+             rng=None):
+        # Same arguments and result as mcts_move
+        solved = solve_endgame(board_obj, piece=self.piece)
+        if solved is not None:
+            # The tree is of no more use once the solver takes over
+            self.root = None
+            self.grid = None
+            self.mirrored = False
+            return solved
+        rng = seeding.make_rng(rng)
+        root = self.advance(board_obj)
+        self.reused_visits = root.visits
+        search_board = board_obj.mirrored() if self.mirrored else board_obj
+        budget = SearchBudget(time_budget, iterations, early_stop)
+        if workers > 1 or batched:
+            run_batch_search(root, search_board, budget, workers, rng=rng)
+        else:
+            run_search(root, search_board, budget, rng)
+        best = root.best_move()
+        info = budget.info(root)
+        col = best.move
+        if self.mirrored:
+            col = board_obj.mirror_column(col)
+            info["visits"] = {board_obj.mirror_column(move): visits for move, visits in info["visits"].items()}
+            info["proven"] = {board_obj.mirror_column(move): proven for move, proven in info["proven"].items()}
+
+        # Keep the subtree after our move for the next turn
+        best.parent = None
+        self.root = best
+        self.grid = board_obj.grid.copy()
+        self.grid[board_obj.get_next_open_row(col), col] = self.piece
+        return col, info
@@ -1,6 +1,7 @@
-import math
-import random
-import numpy as np
+import evaluation
+import minimax_search
+import seeding
+import transposition
 
 def evaluate_window(window, piece):
     score = 0
@@ -18,89 +19,28 @@ def evaluate_window(window, piece):
 
     return score
 
-def score_position(board, piece):
-    score = 0
-    ROW_COUNT = board.shape[0]
-    COLUMN_COUNT = board.shape[1]
-
-    # Score Horizontal
-    for r in range(ROW_COUNT):
-        row_array = list(board[r, :])
-        for c in range(COLUMN_COUNT - 3):
-            window = row_array[c:c+4]
-            score += evaluate_window(window, piece)
-
-    # Score Vertical
-    for c in range(COLUMN_COUNT):
-        col_array = list(board[:, c])
-        for r in range(ROW_COUNT - 3):
-            window = col_array[r:r+4]
-            score += evaluate_window(window, piece)
-
-    # Score positive sloped diagonal
-    for r in range(ROW_COUNT - 3):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r+i][c+i] for i in range(4)]
-            score += evaluate_window(window, piece)
-
-    # Score negative sloped diagonal
-    for r in range(3, ROW_COUNT):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r-i][c+i] for i in range(4)]
-            score += evaluate_window(window, piece)
+# Scores of evaluate_window by (own pieces, opponent pieces) in the window
+WINDOW_SCORES = evaluation.window_score_table(evaluate_window)
 
-    return score
-
-def is_terminal_node(board_obj):
-    return board_obj.has_four_in_a_row(1) or board_obj.has_four_in_a_row(2) or board_obj.is_full()
-
-def get_valid_locations(board_obj):
-    return [col for col in range(board_obj.column_count) if board_obj.is_valid_location(col)]
-
-
-def minimax(board_obj, depth, alpha, beta, maximizingPlayer, piece):
-    valid_locations = get_valid_locations(board_obj)
-    terminal = is_terminal_node(board_obj)
-    if depth == 0 or terminal:
-        if terminal:
-            if board_obj.has_four_in_a_row(piece):
-                return (None, 100000000000000)
-            elif board_obj.has_four_in_a_row(3 - piece):
-                return (None, -10000000000000)
-            else:  # Game is over, no more valid moves
-                return (None, 0)
-        else:  # Depth is zero
-            return (None, score_position(board_obj.grid, piece))
-    
-    if maximizingPlayer:
-        value = -math.inf
-        best_column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = board_obj.get_next_open_row(col)
-            temp_board = np.copy(board_obj.grid)
-            board_obj.drop_piece(row, col, piece)
-            new_score = minimax(board_obj, depth-1, alpha, beta, False, piece)[1]
-            board_obj.grid = temp_board
-            if new_score > value:
-                value = new_score
-                best_column = col
-            alpha = max(alpha, value)
-            if alpha >= beta:
-                break
-        return best_column, value
-    else:
-        value = math.inf
-        best_column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = board_obj.get_next_open_row(col)
-            temp_board = np.copy(board_obj.grid)
-            board_obj.drop_piece(row, col, 3 - piece)
-            new_score = minimax(board_obj, depth-1, alpha, beta, True, piece)[1]
-            board_obj.grid = temp_board
-            if new_score < value:
-                value = new_score
-                best_column = col
-            beta = min(beta, value)
-            if alpha >= beta:
-                break
-        return best_column, value
\ No newline at end of file
+def score_position(board, piece):
+    return evaluation.score_grid(board, piece, WINDOW_SCORES)
+
+def make_evaluator(board_obj):
+    return evaluation.IncrementalEvaluator(board_obj, WINDOW_SCORES, name=__name__)
+
+def minimax(board_obj, depth, alpha, beta, maximizingPlayer, piece, last_move=None, rng=None):
+    # Entry point for a root search; entries from earlier moves stay in the
+    # shared table but become replaceable
+    minimax_search.new_search(transposition.shared_table)
+    return minimax_search.minimax(board_obj, depth, alpha, beta, maximizingPlayer, piece, make_evaluator(board_obj),
+                                  last_move, transposition.shared_table, rng=seeding.make_rng(rng))
+
+def iterative_deepening(board_obj, piece, time_budget=minimax_search.SEARCH_TIME, max_depth=None, rng=None):
+    minimax_search.new_search(transposition.shared_table)
+    return minimax_search.iterative_deepening(board_obj, piece, make_evaluator(board_obj), time_budget, max_depth,
+                                              transposition.shared_table, seeding.make_rng(rng))
+
+def parallel_minimax(board_obj, depth, piece, workers, rng=None):
+    minimax_search.new_search(transposition.shared_table)
+    return minimax_search.parallel_minimax(board_obj, depth, piece, make_evaluator(board_obj), workers,
+                                           transposition.shared_table, seeding.make_rng(rng))
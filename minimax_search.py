@@ -0,0 +1,288 @@
+import concurrent.futures
+import math
+import random
+import time
+import endgame_solver
+import transposition
+import worker_pool
+
+WIN_SCORE = 100000000000000
+LOSS_SCORE = -10000000000000
+
+SEARCH_TIME = 0.25  # default seconds per move for iterative deepening
+
+WORKER_TABLE_SIZE = 1 << 16  # slots in the table of each root child searched by parallel_minimax
+
+# Order children center-out with killer and history moves first. False keeps
+# plain left-to-right order (after the stored best move) for comparison.
+MOVE_ORDERING = True
+
+# In left-right symmetric positions search only one of each pair of mirrored
+# moves, which lead to positions of equal value
+SYMMETRY_PRUNING = True
+
+# Node counts for the current root search and since the process started;
+# depth and time are filled in by iterative_deepening
+search_stats = {"nodes": 0, "total_nodes": 0, "depth": 0, "time": 0.0}
+
+killer_moves = {}  # remaining depth -> the last two columns that caused a cutoff
+history = {}  # (mover, column) -> sum of depth squared over cutoffs
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def get_winner(board_obj, last_move=None):
+    # When the last move is known only the lines through it need checking
+    if last_move is not None:
+        row, col, mover = last_move
+        return mover if board_obj.wins_after(row, col, mover) else 0
+    if board_obj.has_four_in_a_row(1):
+        return 1
+    if board_obj.has_four_in_a_row(2):
+        return 2
+    return 0
+
+def is_terminal_node(board_obj, last_move=None):
+    return get_winner(board_obj, last_move) != 0 or board_obj.is_full()
+
+def get_valid_locations(board_obj):
+    return [col for col in range(board_obj.column_count) if board_obj.is_valid_location(col)]
+
+
+def solve_endgame(board_obj, piece):
+    # Near the end of the game the solver's exact result replaces the
+    # heuristic search. Returns (column, value) like minimax, or None when the
+    # position is outside the solver's range.
+    if not endgame_solver.in_range(board_obj):
+        return None
+    solution = endgame_solver.solve(board_obj, piece)
+    if solution.outcome == endgame_solver.WIN:
+        return solution.move, WIN_SCORE
+    if solution.outcome == endgame_solver.LOSS:
+        return solution.move, LOSS_SCORE
+    return solution.move, 0
+
+def new_search(table=None):
+    # Reset the ordering tables and node count before a root search
+    killer_moves.clear()
+    history.clear()
+    search_stats["nodes"] = 0
+    if table is not None:
+        table.new_search()
+
+def prune_symmetric(board_obj, valid_locations):
+    if SYMMETRY_PRUNING and board_obj.is_symmetric():
+        return [col for col in valid_locations if col <= board_obj.mirror_column(col)]
+    return valid_locations
+
+def order_moves(valid_locations, column_count, mover, depth, first_moves):
+    # Moves in first_moves go in front, then killers, then by history score,
+    # then closest to the center column
+    center = (column_count - 1) / 2
+    killers = killer_moves.get(depth, ())
+    def priority(col):
+        return (col not in killers, -history.get((mover, col), 0), abs(col - center))
+    front = []
+    for col in first_moves:
+        if col in valid_locations and col not in front:
+            front.append(col)
+    rest = sorted((col for col in valid_locations if col not in front), key=priority)
+    return front + rest
+
+def record_cutoff(col, mover, depth):
+    killers = killer_moves.setdefault(depth, [])
+    if col not in killers:
+        killers.insert(0, col)
+        del killers[2:]
+    history[(mover, col)] = history.get((mover, col), 0) + depth * depth
+
+
+def minimax(board_obj, depth, alpha, beta, maximizingPlayer, piece, evaluator, last_move=None, table=None,
+            deadline=None, first_move=None, rng=random):
+    # Alpha-beta search shared by the minimax heuristics, which only differ in
+    # the evaluator's weights. The evaluator must start in sync with the board
+    # and is kept in sync with every move. Values are always from piece's
+    # point of view. rng breaks ties between moves.
+    if deadline is not None and time.monotonic() > deadline:
+        raise SearchTimeout()
+    search_stats["nodes"] += 1
+    search_stats["total_nodes"] += 1
+    valid_locations = get_valid_locations(board_obj)
+    winner = get_winner(board_obj, last_move)
+    terminal = winner != 0 or not valid_locations
+    if depth == 0 or terminal:
+        if terminal:
+            if winner == piece:
+                return (None, WIN_SCORE)
+            elif winner == 3 - piece:
+                return (None, LOSS_SCORE)
+            else:  # Game is over, no more valid moves
+                return (None, 0)
+        else:  # Depth is zero
+            return (None, evaluator.score(piece))
+    if last_move is None and maximizingPlayer:
+        solved = solve_endgame(board_obj, piece)
+        if solved is not None:
+            return solved
+
+    # A position and its mirror image share an entry, stored the way round
+    # canonical_hash picks, so moves are mirrored going in and out
+    key = None
+    entry_move = None
+    mirrored = board_obj.is_mirrored()
+    if table is not None:
+        key = (evaluator.name_key, piece, maximizingPlayer, board_obj.canonical_hash())
+        entry = table.probe(key)
+        if entry is not None:
+            _, entry_depth, flag, entry_value, entry_move, _ = entry
+            if mirrored and entry_move is not None:
+                entry_move = board_obj.mirror_column(entry_move)
+            if entry_depth >= depth:
+                if flag == transposition.EXACT:
+                    return entry_move, entry_value
+                if flag == transposition.LOWER_BOUND and entry_value >= beta:
+                    return entry_move, entry_value
+                if flag == transposition.UPPER_BOUND and entry_value <= alpha:
+                    return entry_move, entry_value
+    alpha_orig, beta_orig = alpha, beta
+
+    # Try the caller's move and then the move that was best last time first
+    mover = piece if maximizingPlayer else 3 - piece
+    valid_locations = prune_symmetric(board_obj, valid_locations)
+    if MOVE_ORDERING:
+        valid_locations = order_moves(valid_locations, board_obj.column_count, mover, depth, (first_move, entry_move))
+    else:
+        for col in (entry_move, first_move):
+            if col in valid_locations:
+                valid_locations.remove(col)
+                valid_locations.insert(0, col)
+    value = -math.inf if maximizingPlayer else math.inf
+    best_column = rng.choice(valid_locations)
+    for col in valid_locations:
+        row = board_obj.play(col, mover)
+        evaluator.add(row, col, mover)
+        try:
+            new_score = minimax(board_obj, depth-1, alpha, beta, not maximizingPlayer, piece, evaluator,
+                                (row, col, mover), table, deadline, None, rng)[1]
+        finally:
+            evaluator.remove(row, col, mover)
+            board_obj.undo()
+        if maximizingPlayer:
+            if new_score > value:
+                value = new_score
+                best_column = col
+            alpha = max(alpha, value)
+        else:
+            if new_score < value:
+                value = new_score
+                best_column = col
+            beta = min(beta, value)
+        if alpha >= beta:
+            if MOVE_ORDERING:
+                record_cutoff(col, mover, depth)
+            break
+
+    if table is not None:
+        if value <= alpha_orig:
+            flag = transposition.UPPER_BOUND
+        elif value >= beta_orig:
+            flag = transposition.LOWER_BOUND
+        else:
+            flag = transposition.EXACT
+        table.store(key, depth, flag, value, board_obj.mirror_column(best_column) if mirrored else best_column)
+    return best_column, value
+
+
+def iterative_deepening(board_obj, piece, evaluator, time_budget=SEARCH_TIME, max_depth=None, table=None,
+                        rng=random):
+    # Search depth 1, 2, 3... until time_budget seconds have passed and return the
+    # result of the deepest search that completed. Each iteration tries the
+    # previous iteration's best move first.
+    start_time = time.monotonic()
+    solved = solve_endgame(board_obj, piece)
+    if solved is not None:
+        search_stats["time"] = time.monotonic() - start_time
+        return solved
+    deadline = start_time + time_budget
+    if max_depth is None:
+        max_depth = int((board_obj.grid == 0).sum())
+
+    best_column, best_value = None, None
+    search_stats["depth"] = 0
+    for depth in range(1, max(max_depth, 1) + 1):
+        try:
+            # Depth 1 always runs to completion so there is a move to return
+            best_column, best_value = minimax(board_obj, depth, -math.inf, math.inf, True, piece, evaluator, None,
+                                              table, deadline if depth > 1 else None, best_column, rng)
+        except SearchTimeout:
+            break
+        search_stats["depth"] = depth
+        if best_value >= WIN_SCORE or best_value <= LOSS_SCORE:
+            break  # forced result found, searching deeper cannot change it
+    search_stats["time"] = time.monotonic() - start_time
+    return best_column, best_value
+
+
+def search_root_child(board_obj, col, depth, alpha, piece, evaluator, seed):
+    # Runs in a worker process: play one root move and search the reply with
+    # an empty table. Which earlier tasks a worker ran depends on scheduling,
+    # and deeper entries left over from them would change the cutoffs, so the
+    # result would not be reproducible.
+    table = transposition.TranspositionTable(WORKER_TABLE_SIZE)
+    new_search(table)
+    row = board_obj.play(col, piece)
+    evaluator.add(row, col, piece)
+    value = minimax(board_obj, depth - 1, alpha, math.inf, False, piece, evaluator, (row, col, piece), table,
+                    rng=random.Random(seed))[1]
+    return value, search_stats["nodes"]
+
+def parallel_minimax(board_obj, depth, piece, evaluator, workers, table=None, rng=random):
+    # Split the root's children over a process pool. Each child is searched
+    # with alpha set to the best value among finished children that come
+    # earlier in move order. A child that fails low therefore never beats an
+    # earlier one, and the move picked is the one the serial search picks.
+    solved = solve_endgame(board_obj, piece)
+    if solved is not None:
+        return solved
+    valid_locations = prune_symmetric(board_obj, get_valid_locations(board_obj))
+    if workers <= 1 or depth <= 1 or len(valid_locations) <= 1 or is_terminal_node(board_obj):
+        return minimax(board_obj, depth, -math.inf, math.inf, True, piece, evaluator, None, table, rng=rng)
+
+    entry_move = None
+    mirrored = board_obj.is_mirrored()
+    key = (evaluator.name_key, piece, True, board_obj.canonical_hash())
+    if table is not None:
+        entry = table.probe(key)
+        if entry is not None and entry[4] is not None:
+            entry_move = board_obj.mirror_column(entry[4]) if mirrored else entry[4]
+    order = order_moves(valid_locations, board_obj.column_count, piece, depth, (entry_move,))
+
+    executor = worker_pool.get_executor(workers)
+    values = {}
+    pending = {}
+    next_index = 0
+    while next_index < len(order) or pending:
+        while next_index < len(order) and len(pending) < workers:
+            earlier = [values[i] for i in range(next_index) if i in values]
+            alpha = max(earlier) if earlier else -math.inf
+            future = executor.submit(search_root_child, board_obj, order[next_index], depth, alpha, piece, evaluator,
+                                     rng.getrandbits(64))
+            pending[future] = next_index
+            next_index += 1
+        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            value, nodes = future.result()
+            values[pending.pop(future)] = value
+            search_stats["nodes"] += nodes
+            search_stats["total_nodes"] += nodes
+
+    best_column, best_value = None, -math.inf
+    for i, col in enumerate(order):
+        if values[i] > best_value:
+            best_column, best_value = col, values[i]
+    if table is not None:
+        table.store(key, depth, transposition.EXACT, best_value,
+                    board_obj.mirror_column(best_column) if mirrored else best_column)
+    return best_column, best_value
@@ -0,0 +1,173 @@
+import argparse
+import importlib
+import math
+import mmap
+import os
+import struct
+import sys
+import board
+import worker_pool
+
+# File layout: MAGIC, HEADER (rows, columns, ply, search depth, name of the
+# agent that built it), then fixed-size RECORDs sorted by key. A record's key
+# is the position's canonical Zobrist hash, which board.ZOBRIST_SEED keeps
+# the same in every process and run, so a position and its mirror image share
+# a record whose move is stored the canonical way round. The side to move
+# follows from the piece counts.
+MAGIC = b"C4OB\x02"
+HEADER = struct.Struct("<BBBB16s")
+RECORD = struct.Struct("<QqB")  # key, value for the player to move, best move
+
+DEFAULT_PLY = 4
+
+_books = {}
+
+
+class OpeningBook:
+    # Read-only view of a book file. The file is memory-mapped, so lookups
+    # touch only the pages binary search visits and every process using the
+    # book shares the same pages of the OS cache.
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        rows, columns, self.ply, self.depth, agent = HEADER.unpack_from(self.data, len(MAGIC))
+        self.shape = (rows, columns)
+        self.agent = agent.rstrip(b"\0").decode("utf-8")
+        self.offset = len(MAGIC) + HEADER.size
+        self.count = (len(self.data) - self.offset) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, board_obj):
+        # (move, value) for the player to move on board_obj, or None if the
+        # position is not in the book
+        if (board_obj.row_count, board_obj.column_count) != self.shape:
+            return None
+        key = board_obj.canonical_hash()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, value, move = RECORD.unpack_from(self.data, self.offset + middle * RECORD.size)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return (board_obj.mirror_column(move) if board_obj.is_mirrored() else move), value
+        return None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def get_book(path):
+    # One open book per path for the whole process
+    if path not in _books:
+        _books[path] = OpeningBook(path)
+    return _books[path]
+
+def book_for(paths, agent):
+    # The first of paths holding a book built by agent, or None
+    for path in paths:
+        if get_book(path).agent == agent:
+            return path
+    return None
+
+def book_move(path, board_obj, agent):
+    # The book's move for board_obj if it has one that is legal, else None.
+    # A book only stands in for the agent that built it.
+    book = get_book(path)
+    if book.agent != agent:
+        raise ValueError(f"{path} was built by {book.agent}, not {agent}")
+    entry = book.lookup(board_obj)
+    if entry is not None and board_obj.is_valid_location(entry[0]):
+        return entry[0]
+    return None
+
+
+def book_positions(row_count, column_count, ply):
+    # Move sequences reaching every position up to ply moves deep that is not
+    # already won, one sequence per position and its mirror image
+    board_obj = board.BitBoard(row_count, column_count)
+    seen = set()
+    positions = []
+    def visit(moves, depth):
+        if board_obj.canonical_hash() in seen:
+            return
+        seen.add(board_obj.canonical_hash())
+        positions.append(tuple(moves))
+        if depth == ply:
+            return
+        turn = len(moves) % 2 + 1
+        for col in range(column_count):
+            if board_obj.is_valid_location(col):
+                row = board_obj.play(col, turn)
+                if not board_obj.wins_after(row, col, turn):
+                    moves.append(col)
+                    visit(moves, depth + 1)
+                    moves.pop()
+                board_obj.undo()
+    visit([], 0)
+    return positions
+
+def search_position(module_name, depth, row_count, column_count, moves):
+    # Runs in a worker process: replay moves and search the position with the
+    # given minimax module
+    module = importlib.import_module(module_name)
+    board_obj = board.BitBoard(row_count, column_count)
+    for i, col in enumerate(moves):
+        board_obj.play(col, i % 2 + 1)
+    piece = len(moves) % 2 + 1
+    col, value = module.minimax(board_obj, depth, -math.inf, math.inf, True, piece, rng=0)
+    if board_obj.is_mirrored():
+        col = board_obj.mirror_column(col)
+    return board_obj.canonical_hash(), col, int(value)
+
+def build(path, module, depth, agent, ply=DEFAULT_PLY, row_count=6, column_count=7, workers=1):
+    # Search every position up to ply moves deep with module's minimax at the
+    # given depth and write the results as a book; returns the entry count
+    positions = book_positions(row_count, column_count, ply)
+    jobs = [(module.__name__, depth, row_count, column_count, moves) for moves in positions]
+    if workers > 1:
+        executor = worker_pool.get_executor(workers)
+        results = executor.map(search_position, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 8)))
+    else:
+        results = (search_position(*job) for job in jobs)
+
+    entries = []
+    for i, entry in enumerate(results):
+        entries.append(entry)
+        if (i + 1) % 100 == 0:
+            print(f"Searched {i + 1}/{len(jobs)} positions")
+    entries.sort()
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(MAGIC + HEADER.pack(row_count, column_count, ply, depth, agent.encode("utf-8")))
+        for key, col, value in entries:
+            f.write(RECORD.pack(key, value, col))
+    os.replace(path + ".tmp", path)
+    return len(entries)
+
+
+def main(argv=None):
+    # Imported here since the simulator itself looks moves up in books
+    import ai_match_simulator
+    parser = argparse.ArgumentParser(description="Build a Connect 4 opening book with a minimax agent.")
+    parser.add_argument("agent", type=ai_match_simulator.resolve_agent, help="minimax AI name or menu number")
+    parser.add_argument("path", help="book file to write")
+    parser.add_argument("--ply", type=int, default=DEFAULT_PLY, help="moves deep to cover")
+    parser.add_argument("--depth", type=int, help="search depth, the agent's own depth by default")
+    parser.add_argument("--workers", type=int, default=1, help="processes searching positions in parallel")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if args.agent not in ai_match_simulator.MINIMAX_MODULES:
+        parser.error(f"{args.agent} is not a minimax AI")
+    module, depth = ai_match_simulator.MINIMAX_MODULES[args.agent]
+    count = build(args.path, module, args.depth or depth, args.agent, args.ply, workers=args.workers)
+    print(f"Wrote {count} positions to {args.path}")
+
+if __name__ == "__main__":
+    main()
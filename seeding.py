@@ -0,0 +1,21 @@
+import random
+import numpy as np
+
+
+def make_rng(rng=None):
+    # Every agent takes an rng argument that may be a random.Random, a seed,
+    # a NumPy Generator or None. This turns any of them into something with
+    # the random.Random interface; None means the module-level generator.
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    if isinstance(rng, np.random.Generator):
+        return random.Random(int(rng.integers(1 << 63)))
+    return rng
+
+def make_numpy_rng(rng):
+    # A NumPy Generator drawn from rng, for the vectorized rollouts
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(make_rng(rng).getrandbits(64))
@@ -0,0 +1,71 @@
+EXACT = 0
+LOWER_BOUND = 1  # search failed high, the true value is at least the stored value
+UPPER_BOUND = 2  # search failed low, the true value is at most the stored value
+
+DEFAULT_SIZE = 1 << 20  # number of slots
+
+
+class TranspositionTable:
+    # Fixed number of slots indexed by the key's hash. A slot holds
+    # (key, depth, flag, value, move, generation). When two keys collide the
+    # deeper search is kept, unless the stored entry is left over from an
+    # earlier root search, in which case it is always replaced.
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.entries = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        # Called once per root search so stale entries lose their priority
+        self.generation += 1
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.slots[hash(key) % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        index = hash(key) % self.size
+        entry = self.slots[index]
+        if entry is None:
+            self.entries += 1
+        elif entry[0] != key:
+            if entry[5] == self.generation and entry[1] > depth:
+                return
+            self.replacements += 1
+        self.stores += 1
+        self.slots[index] = (key, depth, flag, value, move, self.generation)
+
+    def clear(self, keep_stats=False):
+        # keep_stats empties the table but keeps counting probes and hits
+        self.slots = [None] * self.size
+        self.entries = 0
+        if keep_stats:
+            return
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def stats(self):
+        return {
+            "entries": self.entries,
+            "size": self.size,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "replacements": self.replacements
+        }
+
+
+# One table shared by all minimax heuristics; keys carry the heuristic's name
+shared_table = TranspositionTable()
@@ -0,0 +1,37 @@
+import atexit
+import concurrent.futures
+import multiprocessing.util
+import os
+
+_executors = {}  # worker count -> pool, owned by this process
+
+SHUTDOWN_PRIORITY = 100  # multiprocessing finalizer priority of shutdown()
+
+
+def _forget_parent_pools():
+    # A forked child inherits the dict, but the pools in it belong to the
+    # parent and are dead here
+    _executors.clear()
+
+os.register_at_fork(after_in_child=_forget_parent_pools)
+
+
+def get_executor(workers):
+    # One pool per worker count is kept for the whole process since starting
+    # workers is slow, and agents with different worker counts may take turns
+    if workers not in _executors:
+        if not _executors:
+            # A pool worker exits through multiprocessing, which skips atexit
+            # and waits for the worker's own children, so shut its pools down
+            # from a multiprocessing finalizer as well. It has to run before
+            # the finalizers of the pools' queues, which have priority 10.
+            multiprocessing.util.Finalize(None, shutdown, exitpriority=SHUTDOWN_PRIORITY)
+        _executors[workers] = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    return _executors[workers]
+
+
+@atexit.register
+def shutdown():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()